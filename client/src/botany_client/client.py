@@ -1,4 +1,5 @@
 import io
+import multiprocessing
 import os
 import pathlib
 import re
@@ -257,6 +258,10 @@ def play(path1, path2, opcode_limit, move_list):
         print(f"{losing_bot} exceeded the opcode limit")
     elif result.result_type == runner.ResultType.INVALID_STATE:
         print(f"{losing_bot} returned an invalid state")
+    elif result.result_type == runner.ResultType.TIME_LIMIT:
+        print(f"{losing_bot} exceeded the time limit")
+    elif result.result_type == runner.ResultType.MEMORY_LIMIT:
+        print(f"{losing_bot} exceeded the memory limit")
     else:
         assert result.result_type == runner.ResultType.COMPLETE
 
@@ -286,18 +291,23 @@ def play(path1, path2, opcode_limit, move_list):
 @click.option("--full-output", is_flag=True)
 @click.option("--num-rounds", type=int, default=None)
 @click.option("--opcode-limit", type=int, default=None, help="set to 0 for no limit")
-def tournament(path1, path2, pathn, full_output, num_rounds, opcode_limit):
+@click.option(
+    "--jobs",
+    type=click.IntRange(min=0),
+    default=1,
+    help="number of processes to play games in, set to 0 to use one per CPU",
+)
+def tournament(path1, path2, pathn, full_output, num_rounds, opcode_limit, jobs):
     game = utils.load_game_module()
 
     paths = [path1, path2] + list(pathn)
     bots = []
 
     for path in paths:
-        mod = utils.create_bot_module("mod", path)
         bots.append(
             {
                 "path": path,
-                "fn": mod.get_next_move,
+                "get_fn": utils.build_get_bot_fn("mod", path),
                 "num_played": 0,
                 "num_wins": 0,
                 "num_draws": 0,
@@ -320,81 +330,106 @@ def tournament(path1, path2, pathn, full_output, num_rounds, opcode_limit):
         print()
         opcode_limit = None
 
-    for bot1 in bots:
-        for bot2 in bots:
-            if bot1 == bot2:
-                continue
+    if jobs == 0:
+        jobs = multiprocessing.cpu_count()
 
-            if full_output:
-                print(f"{bot1['path']} vs {bot2['path']}")
+    pairings = [
+        (ix1, ix2) for ix1 in range(len(bots)) for ix2 in range(len(bots)) if ix1 != ix2
+    ]
 
-            for ix in range(num_rounds):
-                result = runner.run_game(
-                    game, bot1["fn"], bot2["fn"], opcode_limit=opcode_limit
+    def play_pairings():
+        # Results are yielded in the same order as pairings, whether or not
+        # games are played in parallel, so that output is deterministic.
+        if jobs == 1:
+            for ix1, ix2 in pairings:
+                yield runner.run_games(
+                    game,
+                    bots[ix1]["get_fn"],
+                    bots[ix2]["get_fn"],
+                    num_rounds,
+                    opcode_limit=opcode_limit,
                 )
+        else:
+            tasks = [(ix1, ix2, num_rounds, opcode_limit) for ix1, ix2 in pairings]
+            with multiprocessing.Pool(
+                jobs, initializer=_init_tournament_worker, initargs=(paths,)
+            ) as pool:
+                yield from pool.imap(_play_tournament_pairing, tasks)
+
+    for (ix1, ix2), results in zip(pairings, play_pairings()):
+        bot1 = bots[ix1]
+        bot2 = bots[ix2]
+
+        if full_output:
+            print(f"{bot1['path']} vs {bot2['path']}")
+
+        for ix, result in enumerate(results):
+            bot1["num_played"] += 1
+            bot2["num_played"] += 1
 
-                bot1["num_played"] += 1
-                bot2["num_played"] += 1
-
-                if result.score == 1:
-                    bot1["num_wins"] += 1
-                    bot1["score"] += 1
-                    bot2["num_losses"] += 1
-                    bot2["score"] -= 1
-
-                    winning_bot = "bot1"
-                    losing_bot = "bot2"
-
-                elif result.score == 0:
-                    bot1["num_draws"] += 1
-                    bot2["num_draws"] += 1
-
-                    winning_bot = None
-                    losing_bot = None
-
-                elif result.score == -1:
-                    bot1["num_losses"] += 1
-                    bot1["score"] -= 1
-                    bot2["num_wins"] += 1
-                    bot2["score"] += 1
-
-                    winning_bot = "bot2"
-                    losing_bot = "bot1"
-
-                else:
-                    assert False
-
-                if winning_bot is None:
-                    result_summary = "game drawn"
-                else:
-                    result_summary = f"{winning_bot} wins"
-
-                if result.result_type == runner.ResultType.INVALID_MOVE:
-                    result_extra = f"{losing_bot} made an invalid move"
-                elif result.result_type == runner.ResultType.EXCEPTION:
-                    result_extra = f"{losing_bot} raised an exception"
-                elif result.result_type == runner.ResultType.TIMEOUT:
-                    result_extra = f"{losing_bot} exceeded the opcode limit"
-                elif result.result_type == runner.ResultType.INVALID_STATE:
-                    result_extra = f"{losing_bot} returned an invalid state"
-                else:
-                    assert result.result_type == runner.ResultType.COMPLETE
-                    result_extra = None
-
-                if full_output:
-                    items = [
-                        str(ix).rjust(len(str(num_rounds))),
-                        result_summary.ljust(10),
-                        "".join(str(move) for move in result.move_list),
-                    ]
-
-                    if result_extra:
-                        items.append(result_extra)
-
-                    print("  " + " ".join(items))
+            if result.score == 1:
+                bot1["num_wins"] += 1
+                bot1["score"] += 1
+                bot2["num_losses"] += 1
+                bot2["score"] -= 1
+
+                winning_bot = "bot1"
+                losing_bot = "bot2"
+
+            elif result.score == 0:
+                bot1["num_draws"] += 1
+                bot2["num_draws"] += 1
+
+                winning_bot = None
+                losing_bot = None
+
+            elif result.score == -1:
+                bot1["num_losses"] += 1
+                bot1["score"] -= 1
+                bot2["num_wins"] += 1
+                bot2["score"] += 1
+
+                winning_bot = "bot2"
+                losing_bot = "bot1"
+
+            else:
+                assert False
+
+            if winning_bot is None:
+                result_summary = "game drawn"
+            else:
+                result_summary = f"{winning_bot} wins"
+
+            if result.result_type == runner.ResultType.INVALID_MOVE:
+                result_extra = f"{losing_bot} made an invalid move"
+            elif result.result_type == runner.ResultType.EXCEPTION:
+                result_extra = f"{losing_bot} raised an exception"
+            elif result.result_type == runner.ResultType.TIMEOUT:
+                result_extra = f"{losing_bot} exceeded the opcode limit"
+            elif result.result_type == runner.ResultType.INVALID_STATE:
+                result_extra = f"{losing_bot} returned an invalid state"
+            elif result.result_type == runner.ResultType.TIME_LIMIT:
+                result_extra = f"{losing_bot} exceeded the time limit"
+            elif result.result_type == runner.ResultType.MEMORY_LIMIT:
+                result_extra = f"{losing_bot} exceeded the memory limit"
+            else:
+                assert result.result_type == runner.ResultType.COMPLETE
+                result_extra = None
 
             if full_output:
-                print()
+                items = [
+                    str(ix).rjust(len(str(num_rounds))),
+                    result_summary.ljust(10),
+                    "".join(str(move) for move in result.move_list),
+                ]
+
+                if result_extra:
+                    items.append(result_extra)
+
+                print("  " + " ".join(items))
+
+        if full_output:
+            print()
 
     if full_output:
         print()
@@ -433,3 +468,28 @@ def tournament(path1, path2, pathn, full_output, num_rounds, opcode_limit):
         ]
 
         print(" | ".join(row_items))
+
+
+# Each process in the pool used by `botany tournament --jobs` loads the game
+# module and reads the bots' code once, when the process starts.
+_worker_game = None
+_worker_get_fns = None
+
+
+def _init_tournament_worker(paths):
+    global _worker_game, _worker_get_fns
+
+    _worker_game = utils.load_game_module()
+    _worker_get_fns = [utils.build_get_bot_fn("mod", path) for path in paths]
+
+
+def _play_tournament_pairing(task):
+    ix1, ix2, num_rounds, opcode_limit = task
+
+    return runner.run_games(
+        _worker_game,
+        _worker_get_fns[ix1],
+        _worker_get_fns[ix2],
+        num_rounds,
+        opcode_limit=opcode_limit,
+    )
@@ -59,6 +59,21 @@ def create_bot_module(name, path):
     return loader.create_module_from_str(name, bot_code, path)
 
 
+def build_get_bot_fn(name, path):
+    """Return function that returns get_next_move() from a new module containing
+    the bot's code each time it is called.
+
+    The code is only read and compiled once.
+    """
+
+    bot_code = read_and_validate_bot_code(path)
+
+    def get_bot_fn():
+        return loader.create_module_from_str(name, bot_code, path).get_next_move
+
+    return get_bot_fn
+
+
 def load_game_module():
     game_module_name = get_setting("botany_game_module")
     try:
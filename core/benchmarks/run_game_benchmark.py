@@ -0,0 +1,73 @@
+"""Benchmark the cost of copying boards in runner.run_game().
+
+Compares running games with each game module's copy_board() function against
+running them with deepcopy() (which is what run_game() falls back to when a game
+module doesn't provide copy_board()), reporting the time per game and the peak
+memory allocated while a game is played.
+
+Run with:
+
+    $ python core/benchmarks/run_game_benchmark.py
+"""
+
+import random
+import timeit
+import tracemalloc
+from types import SimpleNamespace
+
+from botany_connectfour import game as connectfour
+from botany_core import runner
+from botany_noughtsandcrosses import game as noughtsandcrosses
+
+NUM_GAMES = 200
+
+
+def without_copy_board(game):
+    """Return copy of game module without a copy_board() function."""
+
+    attrs = {k: v for k, v in vars(game).items() if k != "copy_board"}
+    return SimpleNamespace(**attrs)
+
+
+def run_random_games(game):
+    rng = random.Random(0)
+
+    def get_next_move(board):
+        return rng.choice(game.available_moves(board))
+
+    for _ in range(NUM_GAMES):
+        runner.run_game(game, get_next_move, get_next_move)
+
+
+def peak_memory_per_game(game):
+    tracemalloc.start()
+    try:
+        run_random_games(game)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return peak
+
+
+def main():
+    for game in [noughtsandcrosses, connectfour]:
+        print(f"{game.__name__} ({NUM_GAMES} games):")
+
+        for label, game_mod in [
+            ("deepcopy()  ", without_copy_board(game)),
+            ("copy_board()", game),
+        ]:
+            time = min(
+                timeit.repeat(lambda: run_random_games(game_mod), number=1, repeat=3)
+            )
+            peak = peak_memory_per_game(game_mod)
+
+            print(
+                f"  {label}: {time / NUM_GAMES * 1000000:8.1f} us/game"
+                f"  {peak / 1024:8.1f} KiB peak"
+            )
+
+
+if __name__ == "__main__":
+    main()
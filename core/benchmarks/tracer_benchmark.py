@@ -0,0 +1,113 @@
+"""Benchmark the overhead of tracer.limited_opcodes().
+
+Compares running a function with no opcode limit, with limited_opcodes(), and
+with a trace function that is called for every opcode (which is how
+limited_opcodes() used to be implemented).
+
+Run with:
+
+    $ python core/benchmarks/tracer_benchmark.py
+"""
+
+import sys
+import timeit
+
+from botany_core import tracer
+
+
+def build_naive_tracer(limit):
+    def naive_tracer(frame, event, arg):
+        frame.f_trace_opcodes = True
+        frame.f_trace_lines = False
+
+        if event == "opcode":
+            naive_tracer.opcode_count += 1
+            if naive_tracer.opcode_count > limit:
+                raise tracer.OpCodeLimitExceeded()
+        return naive_tracer
+
+    naive_tracer.opcode_count = 0
+    return naive_tracer
+
+
+def work():
+    """Do something bot-like: count positions reachable in noughts and crosses."""
+
+    lines = [
+        [0, 1, 2],
+        [3, 4, 5],
+        [6, 7, 8],
+        [0, 3, 6],
+        [1, 4, 7],
+        [2, 5, 8],
+        [0, 4, 8],
+        [2, 4, 6],
+    ]
+
+    def has_winner(board):
+        for a, b, c in lines:
+            if board[a] != "." and board[a] == board[b] == board[c]:
+                return True
+        return False
+
+    def count(board, token, depth):
+        if depth == 0 or has_winner(board):
+            return 1
+
+        total = 1
+        for pos in range(9):
+            if board[pos] == ".":
+                board[pos] = token
+                total += count(board, "O" if token == "X" else "X", depth - 1)
+                board[pos] = "."
+        return total
+
+    return count(["."] * 9, "X", 5)
+
+
+def run_untraced():
+    work()
+
+
+def run_limited():
+    with tracer.limited_opcodes(10 ** 9):
+        work()
+
+
+def run_naive():
+    original_tracer = sys.gettrace()
+    sys.settrace(build_naive_tracer(10 ** 9))
+    try:
+        work()
+    finally:
+        sys.settrace(original_tracer)
+
+
+def main():
+    number = 5
+    backend = "sys.monitoring" if tracer.use_monitoring else "sys.settrace"
+
+    print(f"Python {sys.version.split()[0]}, limited_opcodes() uses {backend}")
+    print()
+
+    untraced = min(timeit.repeat(run_untraced, number=number, repeat=3))
+    limited = min(timeit.repeat(run_limited, number=number, repeat=3))
+    naive = min(timeit.repeat(run_naive, number=number, repeat=3))
+
+    print(f"untraced:          {untraced / number * 1000:8.1f} ms")
+    print(
+        f"limited_opcodes(): {limited / number * 1000:8.1f} ms"
+        f"  ({limited / untraced:.1f}x untraced)"
+    )
+    print(
+        f"per-opcode tracer: {naive / number * 1000:8.1f} ms"
+        f"  ({naive / untraced:.1f}x untraced)"
+    )
+
+    if tracer.use_monitoring:
+        print()
+        print("(The per-opcode tracer doesn't count every opcode on this version)")
+
+
+if __name__ == "__main__":
+    main()
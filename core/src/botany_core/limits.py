@@ -0,0 +1,176 @@
+"""Limits on the wall-clock time and the memory that a bot can use for a move.
+
+These complement tracer.limited_opcodes(), which can't stop a bot that spends a
+long time in a single opcode (such as a call to sorted() on a huge list, or
+arithmetic with huge integers), or that allocates a lot of memory.
+"""
+
+import signal
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from . import tracer
+
+time_limit_supported = hasattr(signal, "setitimer")
+
+# Added in Python 3.9
+_reset_peak = getattr(tracemalloc, "reset_peak", None)
+
+
+class TimeLimitExceeded(Exception):
+    pass
+
+
+class MoveTimer:
+    """Context manager that raises TimeLimitExceeded if the block runs for more
+    than seconds.  This is created by limited_time(), which installs the SIGALRM
+    handler for a whole game, so entering and leaving the block only sets and
+    clears the timer.
+
+    A bot might catch TimeLimitExceeded, so callers should check exceeded after
+    the block.
+
+    This is a class rather than a generator so that entering and leaving the
+    block executes as few opcodes as possible, since it is used inside
+    tracer.limited_opcodes().
+    """
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.exceeded = False
+        self.enabled = (
+            seconds is not None
+            and time_limit_supported
+            and threading.current_thread() is threading.main_thread()
+        )
+
+    def __enter__(self):
+        self.exceeded = False
+        if self.enabled:
+            signal.setitimer(signal.ITIMER_REAL, self.seconds)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.enabled:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+
+    def handler(self, signum, frame):
+        self.exceeded = True
+        raise TimeLimitExceeded()
+
+
+@contextmanager
+def limited_time(seconds):
+    """Yield a MoveTimer that limits each move in the block to seconds.
+
+    This uses SIGALRM, so does nothing outside the main thread.  The exception
+    can only be raised between opcodes, so a single long-running call into C
+    code is not interrupted until it returns.  botany_core.sandbox kills worker
+    processes that take much longer than this.
+
+    Any timer already set with setitimer() or alarm() (such as the one rq uses
+    to time out jobs) is paused in the block, and restored afterwards.
+    """
+
+    timer = MoveTimer(seconds)
+
+    if not timer.enabled:
+        yield timer
+        return
+
+    start = time.monotonic()
+    original_handler = signal.signal(signal.SIGALRM, timer.handler)
+    original_timer = signal.setitimer(signal.ITIMER_REAL, 0)
+
+    try:
+        yield timer
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, original_handler)
+
+        delay, interval = original_timer
+        if delay:
+            # If the original timer would have gone off in the block, it goes
+            # off as soon as possible after the block instead.
+            delay = max(delay - (time.monotonic() - start), 1e-6)
+            signal.setitimer(signal.ITIMER_REAL, delay, interval)
+
+
+class MoveMemoryTracker:
+    """Context manager that records whether the peak memory allocated in the
+    block was more than limit bytes.  This is created by limited_memory(), which
+    keeps tracemalloc running for a whole game.
+
+    The limit is only checked at the end of the block, so callers should check
+    exceeded after the block.
+    """
+
+    def __init__(self, limit, owns_tracing):
+        self.limit = limit
+        self.owns_tracing = owns_tracing
+        self.exceeded = False
+
+    def __enter__(self):
+        self.exceeded = False
+        if self.limit is None:
+            return self
+
+        if _reset_peak is not None:
+            _reset_peak()
+        elif self.owns_tracing:
+            # This also resets the peak, but would discard the traces of anything
+            # else that was using tracemalloc
+            tracemalloc.clear_traces()
+
+        self.start_memory, self.start_peak = tracemalloc.get_traced_memory()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.limit is None:
+            return
+
+        _, peak = tracemalloc.get_traced_memory()
+
+        # If the peak couldn't be reset, and the block didn't reach a new peak,
+        # we can't tell how much it allocated.
+        if peak > self.start_peak:
+            self.exceeded = peak - self.start_memory > self.limit
+
+
+@contextmanager
+def limited_memory(limit):
+    """Yield a MoveMemoryTracker that checks whether each move in the block
+    allocated more than limit bytes at its peak.
+
+    This uses tracemalloc, which can't stop an allocation as it happens, so the
+    limit is checked at the end of each move.  Allocating an amount of memory
+    that would be a problem in a single go should be stopped by a limit on the
+    process's address space (see botany_core.sandbox) raising MemoryError.
+
+    Tracing memory allocations slows them down, so tracing is stopped at the end
+    of the block unless it was already running.  Starting and stopping tracing
+    is itself slow, so this is done once for the block, rather than for each
+    move.
+    """
+
+    if limit is None:
+        yield MoveMemoryTracker(None, False)
+        return
+
+    owns_tracing = not tracemalloc.is_tracing()
+    if owns_tracing:
+        tracemalloc.start()
+
+    try:
+        yield MoveMemoryTracker(limit, owns_tracing)
+    finally:
+        if owns_tracing:
+            tracemalloc.stop()
+
+
+# Don't count the opcodes executed when entering and leaving a MoveTimer block
+# within tracer.limited_opcodes(), or in the signal handler
+for method in [MoveTimer.__enter__, MoveTimer.__exit__, MoveTimer.handler]:
+    tracer.exclude_from_count(method.__code__)
@@ -1,12 +1,133 @@
+import hashlib
+import marshal
+import os
+import sys
+import tempfile
+from collections import OrderedDict
 from importlib import import_module
+from importlib.util import MAGIC_NUMBER
 from types import ModuleType
 
 
-def create_module_from_str(name, code, path=None):
+class CodeCache:
+    """LRU cache of compiled code, keyed by a hash of the source code, the
+    filename it is compiled with, and the version of Python's bytecode.
+
+    If cache_dir is given, compiled code is also marshalled to files there, like
+    __pycache__, so that it survives between processes.  Anyone who can write
+    to cache_dir can make us run arbitrary code, so it must only be writable by
+    the processes that use the cache.
+
+    Each call to create_module_from_str() with the same code gets the same code
+    object, but a fresh module.  Modules themselves can't be cached, since a bot
+    could keep state in its module's namespace between games.
+    """
+
+    def __init__(self, maxsize=128, cache_dir=None):
+        self.maxsize = maxsize
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+        self._code_objects = OrderedDict()
+
+    def get_code_object(self, source, filename="<string>"):
+        key = self._key(source, filename)
+
+        try:
+            code_object = self._code_objects[key]
+        except KeyError:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._code_objects.move_to_end(key)
+            return code_object
+
+        code_object = None
+        if self.cache_dir:
+            code_object = self._read(key)
+
+        if code_object is None:
+            code_object = compile(source, filename, "exec")
+            if self.cache_dir:
+                self._write(key, code_object)
+
+        self._code_objects[key] = code_object
+
+        if len(self._code_objects) > self.maxsize:
+            self._code_objects.popitem(last=False)
+
+        return code_object
+
+    def clear(self):
+        self._code_objects.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._code_objects)
+
+    def _key(self, source, filename):
+        h = hashlib.sha256(MAGIC_NUMBER)
+        h.update(filename.encode() + b"\0")
+        h.update(source.encode())
+        return h.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.{sys.implementation.cache_tag}")
+
+    def _read(self, key):
+        try:
+            with open(self._path(key), "rb") as f:
+                magic_number = f.read(len(MAGIC_NUMBER))
+                data = f.read()
+        except OSError:
+            return None
+
+        if magic_number != MAGIC_NUMBER:
+            return None
+
+        try:
+            return marshal.loads(data)
+        except (EOFError, ValueError, TypeError):
+            return None
+
+    def _write(self, key, code_object):
+        # Write to a temporary file and then rename it, so that concurrent
+        # readers never see a partially written file.  Failing to write to the
+        # cache isn't an error.
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with tempfile.NamedTemporaryFile(dir=self.cache_dir, delete=False) as f:
+                try:
+                    f.write(MAGIC_NUMBER + marshal.dumps(code_object))
+                    # Flush the file before it becomes visible to readers
+                    f.close()
+                    os.replace(f.name, self._path(key))
+                except BaseException:
+                    os.unlink(f.name)
+                    raise
+        except OSError:
+            pass
+
+
+# Used by create_module_from_str() unless it is given another cache
+code_cache = CodeCache()
+
+
+def create_module_from_str(name, code, path=None, cache=None):
+    """Return new module with given name, by executing code, which may be a
+    string or a code object.
+
+    The compiled code for a string is looked up in cache, or in code_cache if
+    cache is None.
+    """
+
     mod = ModuleType(name)
     if path is not None:
         mod.__file__ = path
-        code = compile(code, path, "exec")
+    if isinstance(code, str):
+        cache = code_cache if cache is None else cache
+        code = cache.get_code_object(code, path or "<string>")
     exec(code, mod.__dict__)
     return mod
 
@@ -2,12 +2,16 @@ import inspect
 import itertools
 import json
 import re
+import sys
+import time
 import traceback
+from array import array
 from copy import copy, deepcopy
 from enum import Enum
 
 import attr
 
+from .limits import TimeLimitExceeded, limited_memory, limited_time
 from .tracer import OpCodeLimitExceeded, limited_opcodes
 
 
@@ -17,6 +21,8 @@ class ResultType(Enum):
     EXCEPTION = "exception"  # The losing player's code raised an exception
     TIMEOUT = "timeout"  # The losing player's code used too many opcodes
     INVALID_STATE = "invalid_state"  # The losing player's code returned invalid state
+    TIME_LIMIT = "time_limit"  # The losing player's code took too long
+    MEMORY_LIMIT = "memory_limit"  # The losing player's code used too much memory
 
 
 @attr.s
@@ -27,27 +33,248 @@ class Result:
     traceback = attr.ib()
     invalid_move = attr.ib()
 
+    # If run_game() was called with collect_stats=True, these are arrays with
+    # the number of opcodes executed and the wall-clock time in seconds taken by
+    # each call to a bot, alternating between the players, starting with the
+    # player who moved first.  The last call may be the one that lost the game,
+    # in which case it may be missing from opcode_counts if it failed before
+    # its opcodes could be counted.
+    opcode_counts = attr.ib(default=None)
+    move_times = attr.ib(default=None)
+
     @property
     def is_complete(self):
         return self.result_type == ResultType.COMPLETE
 
 
 def rerun_game(game, move_list):
-    boards = [game.new_board()]
+    """Return list of boards, starting with the empty board, after each move in
+    move_list."""
+
+    return list(generate_boards(game, move_list))
+
+
+def generate_boards(game, move_list):
+    """Yield boards, starting with the empty board, after each move in
+    move_list.
+
+    Each board is a new copy, so callers can keep hold of them.
+    """
+
+    board = game.new_board()
+    yield copy_board(game, board)
 
     for token, move in zip(itertools.cycle(game.TOKENS), move_list):
-        board = deepcopy(boards[-1])
-        available_moves = game.available_moves(board)
-        assert move in available_moves
-        game.make_move(board, move, token)
-        boards.append(board)
+        _replay_move(game, board, move, token)
+        yield copy_board(game, board)
+
+
+def final_board(game, move_list):
+    """Return board after all the moves in move_list.
+
+    Unlike rerun_game(), this doesn't copy the board after each move.
+    """
+
+    board = game.new_board()
+
+    for token, move in zip(itertools.cycle(game.TOKENS), move_list):
+        _replay_move(game, board, move, token)
 
-    return boards
+    return board
 
 
-def run_game(game, fn1, fn2, opcode_limit=None, display_board=False, move_list=None):
+def _replay_move(game, board, move, token):
+    available_moves = game.available_moves(board)
+    assert move in available_moves
+    game.make_move(board, move, token)
+
+
+def run_game(
+    game,
+    fn1,
+    fn2,
+    opcode_limit=None,
+    display_board=False,
+    move_list=None,
+    time_limit=None,
+    memory_limit=None,
+    collect_stats=False,
+):
+    """Play a game between fn1 and fn2, returning a Result.
+
+    Each call to fn1 or fn2 may execute at most opcode_limit opcodes, take at
+    most time_limit seconds, and allocate at most memory_limit bytes.
+
+    If collect_stats is True, the Result includes the number of opcodes and the
+    time taken by each move.
+    """
+
+    validate_game(game)
+    param_lists = [get_param_list(fn1), get_param_list(fn2)]
+
+    with limited_time(time_limit) as move_timer:
+        with limited_memory(memory_limit) as memory_tracker:
+            get_move = build_get_move(
+                [fn1, fn2], opcode_limit, move_timer, memory_tracker, collect_stats
+            )
+            return run_game_using(
+                game, get_move, param_lists, display_board, move_list, collect_stats
+            )
+
+
+def run_games(
+    game,
+    get_fn1,
+    get_fn2,
+    num_games,
+    opcode_limit=None,
+    time_limit=None,
+    memory_limit=None,
+    collect_stats=False,
+):
+    """Play num_games games between two bots, returning a list of Results.
+
+    get_fn1 and get_fn2 are called before each game, and should return the bots'
+    functions from newly created modules, so that a bot can't carry state
+    between games in its module's globals or its functions' attributes.  They
+    must return functions with the same parameters each time.
+
+    This does the rest of the per-match setup (validating the game, inspecting
+    the signatures of the bot functions, and setting up the time and memory
+    limits) once, rather than once per game.
+    """
+
+    validate_game(game)
+    param_lists = None
+    results = []
+
+    with limited_time(time_limit) as move_timer:
+        with limited_memory(memory_limit) as memory_tracker:
+            for _ in range(num_games):
+                fns = [get_fn1(), get_fn2()]
+
+                if param_lists is None:
+                    param_lists = [get_param_list(fn) for fn in fns]
+
+                get_move = build_get_move(
+                    fns, opcode_limit, move_timer, memory_tracker, collect_stats
+                )
+                results.append(
+                    run_game_using(
+                        game, get_move, param_lists, collect_stats=collect_stats
+                    )
+                )
+
+    return results
+
+
+def build_get_move(fns, opcode_limit, move_timer, memory_tracker, collect_stats):
+    """Return function for run_game_using() that calls the bots' functions in
+    this process, with call_bot()."""
+
+    # Opcodes can only be counted by limited_opcodes()
+    if collect_stats and opcode_limit is None:
+        opcode_limit = sys.maxsize
+
+    def get_move(player_ix, args):
+        return call_bot(fns[player_ix], args, opcode_limit, move_timer, memory_tracker)
+
+    return get_move
+
+
+def call_bot(fn, args, opcode_limit, move_timer, memory_tracker):
+    """Call a bot's function with args, within the limits, returning
+    (result_type, move, state, traceback, opcode_count).
+
+    result_type is None if the bot returned a move and a state that can be
+    serialised to JSON.  Otherwise it is the ResultType of the bot losing, and
+    the move and state are None, except for INVALID_STATE, where the move is
+    given so that an invalid move can take precedence.  The move is not checked
+    here.
+
+    move_timer and memory_tracker are the context managers yielded by
+    limits.limited_time() and limits.limited_memory().  opcode_count is None if
+    opcode_limit is None, or if the call failed before opcodes were counted.
+    """
+
+    counter = None
+    result_type = None
+    tb = None
+
+    # The time limit is innermost, so that its signal can't interrupt the code
+    # that removes the other limits.
+    try:
+        with memory_tracker:
+            if opcode_limit is None:
+                with move_timer:
+                    rv = fn(**args)
+            else:
+                with limited_opcodes(opcode_limit) as counter:
+                    with move_timer:
+                        rv = fn(**args)
+    except OpCodeLimitExceeded:
+        result_type = ResultType.TIMEOUT
+    except TimeLimitExceeded:
+        result_type = ResultType.TIME_LIMIT
+    except MemoryError:
+        result_type = ResultType.MEMORY_LIMIT
+    except Exception:
+        result_type = ResultType.EXCEPTION
+        tb = traceback.format_exc()
+
+    opcode_count = None if counter is None else counter.opcode_count
+
+    # The bot might have caught TimeLimitExceeded, and the memory limit is only
+    # checked at the end of the move
+    if result_type is None:
+        if move_timer.exceeded:
+            result_type = ResultType.TIME_LIMIT
+        elif memory_tracker.exceeded:
+            result_type = ResultType.MEMORY_LIMIT
+
+    if result_type is not None:
+        return result_type, None, None, tb, opcode_count
+
+    try:
+        move, state = rv
+    except (TypeError, ValueError):
+        move, state = rv, None
+
+    try:
+        json.dumps(state)
+    except TypeError:
+        return ResultType.INVALID_STATE, move, None, None, opcode_count
+
+    return None, move, state, None, opcode_count
+
+
+def run_game_using(
+    game,
+    get_move,
+    param_lists,
+    display_board=False,
+    move_list=None,
+    collect_stats=False,
+):
+    """Play a game, returning a Result.
+
+    get_move is called with the index of the player who is to move (0 or 1) and a
+    dict of arguments for that player's bot, and returns the same as
+    call_bot().  This lets the bots be called in another process (see
+    botany_core.sandbox).  param_lists are the names of each bot's parameters.
+    """
+
+    # This has to happen before every game, and not just once per match, so
+    # that no state can be carried between games.
     re.purge()  # See https://github.com/inglesp/botany/issues/48.
 
+    if collect_stats:
+        opcode_counts = array("l")
+        move_times = array("d")
+    else:
+        opcode_counts = None
+        move_times = None
+
     def build_result(result_type, score, traceback=None, invalid_move=None):
         return Result(
             result_type=result_type,
@@ -55,12 +282,10 @@ def run_game(game, fn1, fn2, opcode_limit=None, display_board=False, move_list=N
             move_list=move_list,
             traceback=traceback,
             invalid_move=invalid_move,
+            opcode_counts=opcode_counts,
+            move_times=move_times,
         )
 
-    # TODO move game validation elsewhere?
-    assert len(game.TOKENS) == 2
-
-    param_lists = [get_param_list(fn1), get_param_list(fn2)]
     states = [None, None]
     winning_scores = [1, -1]
     losing_scores = [-1, 1]
@@ -71,8 +296,7 @@ def run_game(game, fn1, fn2, opcode_limit=None, display_board=False, move_list=N
         move_list = []
     else:
         # If there is a list of moves, rerun the game
-        boards = rerun_game(game, move_list)
-        board = boards[-1]
+        board = final_board(game, move_list)
         if len(move_list) % 2 == 1:
             # If the number of moves is odd, player 2 is the next to play
             player_ixs = [1, 0]
@@ -82,14 +306,13 @@ def run_game(game, fn1, fn2, opcode_limit=None, display_board=False, move_list=N
 
     for player_ix in itertools.cycle(player_ixs):
         token = game.TOKENS[player_ix]
-        fn = [fn1, fn2][player_ix]
 
         available_moves = game.available_moves(board)
         if available_moves == []:
             return build_result(ResultType.COMPLETE, 0)
 
         all_args = {
-            "board": deepcopy(board),
+            "board": board_for_bot(game, board),
             "move_list": copy(move_list),
             "token": token,
             "state": states[player_ix],
@@ -101,32 +324,24 @@ def run_game(game, fn1, fn2, opcode_limit=None, display_board=False, move_list=N
             if param in param_lists[player_ix]
         }
 
-        try:
-            if opcode_limit is None:
-                rv = fn(**args)
-            else:
-                with limited_opcodes(opcode_limit):
-                    rv = fn(**args)
-        except OpCodeLimitExceeded:
-            return build_result(ResultType.TIMEOUT, losing_scores[player_ix])
-        except Exception:
-            return build_result(
-                ResultType.EXCEPTION, losing_scores[player_ix], traceback.format_exc()
-            )
+        start = time.perf_counter()
+        result_type, move, state, tb, opcode_count = get_move(player_ix, args)
 
-        try:
-            move, state = rv
-        except TypeError:
-            move, state = rv, None
+        # Stats include the move that lost the game, if any
+        if collect_stats:
+            move_times.append(time.perf_counter() - start)
+            if opcode_count is not None:
+                opcode_counts.append(opcode_count)
+
+        if result_type is not None and result_type != ResultType.INVALID_STATE:
+            return build_result(result_type, losing_scores[player_ix], tb)
 
         if move not in available_moves:
             return build_result(
                 ResultType.INVALID_MOVE, losing_scores[player_ix], invalid_move=move
             )
 
-        try:
-            json.dumps(state)
-        except TypeError:
+        if result_type == ResultType.INVALID_STATE:
             return build_result(ResultType.INVALID_STATE, losing_scores[player_ix])
 
         states[player_ix] = state
@@ -137,11 +352,53 @@ def run_game(game, fn1, fn2, opcode_limit=None, display_board=False, move_list=N
         if display_board:
             print(game.render_text(board))
 
-        winner = game.check_winner(board)
+        winner = check_winner_after(game, board, move, token)
         if winner is not None:
             assert winner == token
             return build_result(ResultType.COMPLETE, winning_scores[player_ix])
 
 
+def board_for_bot(game, board):
+    """Return representation of board to pass to a bot.
+
+    Games that use a different representation of a board internally can provide
+    a board_for_bot() function to convert the board.  Otherwise, bots are given
+    a copy of the board, so that they can't change the board used by the game.
+    """
+
+    if hasattr(game, "board_for_bot"):
+        return game.board_for_bot(board)
+    return copy_board(game, board)
+
+
+def copy_board(game, board):
+    """Return copy of board.
+
+    Games can provide a copy_board() function, which is much faster than
+    deepcopy() since it knows the structure of the board.
+    """
+
+    if hasattr(game, "copy_board"):
+        return game.copy_board(board)
+    return deepcopy(board)
+
+
+def check_winner_after(game, board, move, token):
+    """Return winning token if the given move, which has just been made by token,
+    won the game, or None.
+
+    Games can provide a check_winner_after() function, which only needs to check
+    the lines passing through the move.  Otherwise, the whole board is checked.
+    """
+
+    if hasattr(game, "check_winner_after"):
+        return game.check_winner_after(board, move, token)
+    return game.check_winner(board)
+
+
+def validate_game(game):
+    assert len(game.TOKENS) == 2
+
+
 def get_param_list(fn):
     return list(inspect.signature(fn).parameters)
@@ -0,0 +1,668 @@
+"""Run games with bots in a pool of long-lived, sandboxed worker processes.
+
+Starting a new interpreter for every game would be too slow, so worker
+processes are reused for many games, until they are recycled.
+
+Each worker process runs a single bot's code, and only ever runs code with the
+same hash, so a bot that tampers with its worker can only affect its own games.
+The game itself is played in the parent process, which sends each worker the
+arguments for its bot's moves, and checks the moves it sends back.  A bot can
+write anything it likes to its end of the pipe, so nothing a worker sends is
+trusted to say more than what its own bot's move was.
+
+Worker processes are started with an environment that contains nothing but a
+few variables needed to find Python packages, so bots can't read settings such
+as database credentials.  The parent process is made non-dumpable, so that a
+bot can't read its environment or memory through /proc.  Workers drop all
+capabilities (and can be run as another user), are also made non-dumpable, so
+that bots can't get at each other, and are killed if the parent dies.  They run
+with resource limits: a cap on their address space, and no ability to write to
+files or to create processes.
+
+If a move takes more than move_timeout seconds (which can happen if a bot spends
+a long time in C code, where limits.limited_time() can't interrupt it) or if the
+worker dies during a move, the worker is killed and the player who was moving
+loses the game.
+
+Messages are JSON, one per line, rather than pickles, since unpickling what a
+bot wrote would run arbitrary code in the parent process.
+"""
+
+import hashlib
+import json
+import os
+import re
+import select
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from contextlib import ExitStack
+
+from . import limits, loader, runner
+
+# Environment variables passed through to worker processes
+ENV_ALLOWLIST = ["PATH", "PYTHONPATH", "LANG", "LC_ALL"]
+
+# Workers that send longer messages than this are killed
+MAX_MESSAGE_SIZE = 16 * 2 ** 20
+
+# The ways a worker can say that its bot lost on its move.  A worker can't
+# report anything else, such as the end of a game.
+WORKER_RESULT_TYPES = {
+    runner.ResultType.EXCEPTION,
+    runner.ResultType.TIMEOUT,
+    runner.ResultType.INVALID_STATE,
+    runner.ResultType.TIME_LIMIT,
+    runner.ResultType.MEMORY_LIMIT,
+}
+
+
+class SandboxError(Exception):
+    pass
+
+
+class SandboxTimeout(SandboxError):
+    pass
+
+
+class SandboxWorker:
+    """A single worker process, which runs one bot at a time.
+
+    If uid and gid are given, the worker switches to them once it has started.
+    """
+
+    def __init__(self, memory_limit=None, move_timeout=None, uid=None, gid=None):
+        env = {name: os.environ[name] for name in ENV_ALLOWLIST if name in os.environ}
+
+        # python -m puts its working directory at the start of sys.path, and
+        # modules are imported from there before the sandbox is in place, so the
+        # worker runs in a new directory that only we can write to.  Each worker
+        # gets its own directory, since a bot could create files in it.
+        self._cwd = tempfile.mkdtemp(prefix="botany-sandbox-")
+
+        self.process = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "botany_core.sandbox",
+                str(memory_limit or 0),
+                str(os.getpid()),
+                str(-1 if uid is None else uid),
+                str(-1 if gid is None else gid),
+            ],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            env=env,
+            cwd=self._cwd,
+        )
+        self.move_timeout = move_timeout
+        self.is_alive = True
+        self.num_games = 0
+        self._buffer = b""
+
+        try:
+            self.initial_maxrss = self._receive(move_timeout)["maxrss"]
+        except (SandboxError, KeyError):
+            self.kill()
+            raise SandboxError("Worker process failed to start")
+
+        self.maxrss = self.initial_maxrss
+
+    def load(self, code):
+        """Load bot's code for a new game, returning the names of the bot's
+        parameters.
+
+        Raises SandboxError if the code raises an exception.  If loading the
+        code takes too long, or the worker dies, the worker is killed too.
+        """
+
+        self.num_games += 1
+        message = self._request({"code": code})
+
+        if "error" in message:
+            raise SandboxError(message["error"])
+
+        try:
+            param_list = message["params"]
+            maxrss = message["maxrss"]
+        except (KeyError, TypeError):
+            self.kill()
+            raise SandboxError("Invalid response from worker process")
+
+        if not (isinstance(maxrss, int) and _is_list_of_str(param_list)):
+            self.kill()
+            raise SandboxError("Invalid response from worker process")
+
+        self.maxrss = maxrss
+        return param_list
+
+    def get_move(self, args, opcode_limit=None, time_limit=None, memory_limit=None):
+        """Call the bot with args, returning the same as runner.call_bot().
+
+        If the move takes too long, or the worker dies, or sends an invalid
+        response, the worker is killed, and the bot loses.
+        """
+
+        try:
+            message = self._request(
+                {
+                    "args": args,
+                    "opcode_limit": opcode_limit,
+                    "time_limit": time_limit,
+                    "memory_limit": memory_limit,
+                }
+            )
+            if "error" in message:
+                raise SandboxError(message["error"])
+            return move_from_json(message)
+        except SandboxError as e:
+            self.kill()
+            if isinstance(e, SandboxTimeout):
+                return runner.ResultType.TIME_LIMIT, None, None, None, None
+            return runner.ResultType.EXCEPTION, None, None, str(e), None
+
+    @property
+    def memory_growth(self):
+        """Return growth in peak memory use since worker started, in bytes."""
+
+        return (self.maxrss - self.initial_maxrss) * 1024
+
+    def close(self):
+        self.is_alive = False
+        self.process.stdin.close()
+        try:
+            self.process.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        self.process.stdout.close()
+        shutil.rmtree(self._cwd, ignore_errors=True)
+
+    def kill(self):
+        if not self.is_alive:
+            return
+
+        self.is_alive = False
+        self.process.kill()
+        self.process.wait()
+        self.process.stdin.close()
+        self.process.stdout.close()
+        shutil.rmtree(self._cwd, ignore_errors=True)
+
+    def _request(self, message):
+        """Send message to worker, and return its response.  If there is no
+        valid response within move_timeout seconds, the worker is killed."""
+
+        try:
+            self._send(message)
+            return self._receive(self.move_timeout)
+        except SandboxError:
+            self.kill()
+            raise
+
+    def _send(self, message):
+        try:
+            self.process.stdin.write(json.dumps(message).encode() + b"\n")
+            self.process.stdin.flush()
+        except BrokenPipeError:
+            raise SandboxError("Worker process exited")
+
+    def _receive(self, timeout=None):
+        """Return next message from worker, raising SandboxTimeout if there is
+        no message within timeout seconds."""
+
+        fd = self.process.stdout.fileno()
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while b"\n" not in self._buffer:
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not select.select([fd], [], [], remaining)[0]:
+                    raise SandboxTimeout(f"No response in {timeout} seconds")
+
+            data = os.read(fd, 65536)
+            if not data:
+                raise SandboxError("Worker process exited")
+            self._buffer += data
+
+            if len(self._buffer) > MAX_MESSAGE_SIZE:
+                raise SandboxError("Invalid response from worker process")
+
+        line, self._buffer = self._buffer.split(b"\n", 1)
+
+        try:
+            message = json.loads(line.decode())
+        except ValueError:
+            raise SandboxError("Invalid response from worker process")
+
+        if not isinstance(message, dict):
+            raise SandboxError("Invalid response from worker process")
+
+        return message
+
+
+class SandboxPool:
+    """A pool of SandboxWorkers, which are started on demand.
+
+    Each match between two bots uses a worker for each bot.  Afterwards, up to
+    max_idle_workers workers are kept, and a worker is only reused for a bot with
+    exactly the same code as the one it last ran.
+
+    A worker is recycled once it has played max_games games, or if its peak
+    memory use has grown by more than max_memory_growth bytes.  A worker whose
+    process dies, or which sends an invalid response, is discarded.
+
+    memory_limit is the maximum size of each worker's address space, and
+    move_timeout is the number of seconds a worker can take over a move before
+    it is killed.  If uid and gid are given, workers run as that user and group.
+    """
+
+    def __init__(
+        self,
+        game_module_path,
+        max_idle_workers=2,
+        max_games=1000,
+        max_memory_growth=None,
+        memory_limit=None,
+        move_timeout=None,
+        uid=None,
+        gid=None,
+    ):
+        self.game = loader.load_module_from_dotted_path(game_module_path)
+        self.max_idle_workers = max_idle_workers
+        self.max_games = max_games
+        self.max_memory_growth = max_memory_growth
+        self.memory_limit = memory_limit
+        self.move_timeout = move_timeout
+        self.uid = uid
+        self.gid = gid
+
+        # List of (code hash, worker) pairs, least recently used first
+        self._idle_workers = []
+        self._lock = threading.Lock()
+
+    def run_games(
+        self,
+        code1,
+        code2,
+        num_games,
+        opcode_limit=None,
+        time_limit=None,
+        memory_limit=None,
+        collect_stats=False,
+    ):
+        """Play num_games games between bots with given code, returning a list of
+        Results.
+
+        Fewer than num_games Results are returned if a game ends with a worker
+        being killed.
+        """
+
+        runner.validate_game(self.game)
+        keys = [_hash_code(code1), _hash_code(code2)]
+        workers = []
+        results = []
+
+        # Opcodes can only be counted by limited_opcodes()
+        if collect_stats and opcode_limit is None:
+            opcode_limit = sys.maxsize
+
+        def get_move(player_ix, args):
+            return workers[player_ix].get_move(
+                args, opcode_limit, time_limit, memory_limit
+            )
+
+        try:
+            workers.extend(self._get_worker(key) for key in keys)
+
+            for _ in range(num_games):
+                result = self._run_game(
+                    [code1, code2], workers, get_move, collect_stats
+                )
+                results.append(result)
+
+                if not all(worker.is_alive for worker in workers):
+                    break
+        except BaseException:
+            # This includes rq's JobTimeoutException
+            for worker in workers:
+                worker.kill()
+            raise
+
+        for key, worker in zip(keys, workers):
+            self._release_worker(key, worker)
+
+        return results
+
+    def close(self):
+        with self._lock:
+            for _, worker in self._idle_workers:
+                worker.close()
+            self._idle_workers = []
+
+    def _run_game(self, codes, workers, get_move, collect_stats):
+        param_lists = []
+
+        # A bot's code could take too long, or kill its worker, before it even
+        # makes a move
+        for player_ix, (code, worker) in enumerate(zip(codes, workers)):
+            try:
+                param_lists.append(worker.load(code))
+            except SandboxError as e:
+                if worker.is_alive:
+                    # The code raised an exception
+                    raise
+                return build_killed_result(e, player_ix, [])
+
+        return runner.run_game_using(
+            self.game, get_move, param_lists, collect_stats=collect_stats
+        )
+
+    def _get_worker(self, key):
+        with self._lock:
+            for ix, (idle_key, worker) in enumerate(self._idle_workers):
+                if idle_key == key:
+                    del self._idle_workers[ix]
+                    return worker
+
+        protect_process()
+
+        return SandboxWorker(self.memory_limit, self.move_timeout, self.uid, self.gid)
+
+    def _release_worker(self, key, worker):
+        if not worker.is_alive:
+            return
+
+        if self._should_recycle(worker):
+            worker.close()
+            return
+
+        with self._lock:
+            self._idle_workers.append((key, worker))
+            if len(self._idle_workers) > self.max_idle_workers:
+                _, evicted_worker = self._idle_workers.pop(0)
+            else:
+                evicted_worker = None
+
+        if evicted_worker is not None:
+            evicted_worker.close()
+
+    def _should_recycle(self, worker):
+        if worker.num_games >= self.max_games:
+            return True
+
+        if self.max_memory_growth is None:
+            return False
+
+        return worker.memory_growth > self.max_memory_growth
+
+
+def build_killed_result(error, player_ix, move_list):
+    """Return Result for a game in which the worker was killed, or died, while
+    player_ix was moving."""
+
+    if isinstance(error, SandboxTimeout):
+        result_type = runner.ResultType.TIME_LIMIT
+        tb = None
+    else:
+        result_type = runner.ResultType.EXCEPTION
+        tb = str(error)
+
+    return runner.Result(
+        result_type=result_type,
+        score=[-1, 1][player_ix],
+        move_list=move_list,
+        traceback=tb,
+        invalid_move=None,
+    )
+
+
+def move_to_json(result_type, move, state, tb, opcode_count):
+    """Return message for the parent describing a move, as returned by
+    runner.call_bot().  The state stays in the worker."""
+
+    try:
+        json.dumps(move)
+    except (TypeError, ValueError):
+        # This can only be an invalid move
+        move = repr(move)
+
+    return {
+        "result_type": None if result_type is None else result_type.value,
+        "move": move,
+        "traceback": tb,
+        "opcode_count": opcode_count,
+    }
+
+
+def move_from_json(message):
+    """Return (result_type, move, state, traceback, opcode_count) from message
+    sent by a worker, raising SandboxError if it is invalid.
+
+    The state is always None, since it is kept in the worker.
+    """
+
+    try:
+        result_type = message["result_type"]
+        move = message["move"]
+        tb = message["traceback"]
+        opcode_count = message["opcode_count"]
+
+        if result_type is not None:
+            result_type = runner.ResultType(result_type)
+    except (KeyError, ValueError):
+        raise SandboxError("Invalid response from worker process")
+
+    if result_type is not None and result_type not in WORKER_RESULT_TYPES:
+        raise SandboxError("Invalid response from worker process")
+
+    if not (tb is None or isinstance(tb, str)):
+        raise SandboxError("Invalid response from worker process")
+
+    if not (opcode_count is None or isinstance(opcode_count, int)):
+        raise SandboxError("Invalid response from worker process")
+
+    return result_type, move, None, tb, opcode_count
+
+
+def _hash_code(code):
+    return hashlib.sha256(code.encode()).hexdigest()
+
+
+def _is_list_of_str(value):
+    return isinstance(value, list) and all(isinstance(item, str) for item in value)
+
+
+# Constants from linux/prctl.h and linux/capability.h
+PR_SET_PDEATHSIG = 1
+PR_SET_DUMPABLE = 4
+PR_SET_NO_NEW_PRIVS = 38
+_LINUX_CAPABILITY_VERSION_3 = 0x20080522
+
+
+def _get_libc():
+    if not sys.platform.startswith("linux"):
+        return None
+
+    import ctypes
+
+    return ctypes.CDLL(None, use_errno=True)
+
+
+def _prctl(libc, option, arg):
+    import ctypes
+
+    if libc.prctl(option, arg, 0, 0, 0) != 0:
+        errno = ctypes.get_errno()
+        raise OSError(errno, os.strerror(errno))
+
+
+def protect_process():
+    """Make this process non-dumpable, so that processes without
+    CAP_SYS_PTRACE, such as sandbox workers, can't read its environment or
+    memory through /proc, even if they run as the same user.
+
+    This does nothing except on Linux.
+    """
+
+    libc = _get_libc()
+    if libc is not None:
+        _prctl(libc, PR_SET_DUMPABLE, 0)
+
+
+def drop_privileges(parent_pid, uid, gid):
+    """Switch to uid and gid (if not None), drop all capabilities, make this
+    process non-dumpable, and make sure it is killed if the parent dies.
+
+    This does nothing except on Linux.
+    """
+
+    libc = _get_libc()
+    if libc is None:
+        return
+
+    import ctypes
+
+    if gid is not None:
+        os.setgroups([])
+        os.setgid(gid)
+    if uid is not None:
+        os.setuid(uid)
+
+    # Don't regain capabilities by executing another program
+    _prctl(libc, PR_SET_NO_NEW_PRIVS, 1)
+
+    class CapHeader(ctypes.Structure):
+        _fields_ = [("version", ctypes.c_uint32), ("pid", ctypes.c_int)]
+
+    class CapData(ctypes.Structure):
+        _fields_ = [
+            ("effective", ctypes.c_uint32),
+            ("permitted", ctypes.c_uint32),
+            ("inheritable", ctypes.c_uint32),
+        ]
+
+    header = CapHeader(_LINUX_CAPABILITY_VERSION_3, 0)
+    if libc.capset(ctypes.byref(header), (CapData * 2)()) != 0:
+        errno = ctypes.get_errno()
+        raise OSError(errno, os.strerror(errno))
+
+    _prctl(libc, PR_SET_DUMPABLE, 0)
+
+    # This has to come after changing user, which clears it.  If the parent has
+    # already died, we have been reparented.
+    _prctl(libc, PR_SET_PDEATHSIG, signal.SIGKILL)
+    if os.getppid() != parent_pid:
+        os._exit(1)
+
+
+def set_resource_limits(memory_limit):
+    import resource
+
+    if memory_limit:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+
+    # Writing to a file fails with EFBIG, rather than killing the process
+    signal.signal(signal.SIGXFSZ, signal.SIG_IGN)
+    resource.setrlimit(resource.RLIMIT_FSIZE, (0, 0))
+    resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+    resource.setrlimit(resource.RLIMIT_NPROC, (0, 0))
+
+
+def get_maxrss():
+    import resource
+
+    # This is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class MoveLimits:
+    """The limits.limited_time() and limits.limited_memory() context managers
+    for a worker, which are only set up again if the limits change."""
+
+    def __init__(self):
+        self.key = None
+        self.exit_stack = ExitStack()
+
+    def get(self, time_limit, memory_limit):
+        """Return (move_timer, memory_tracker) for given limits."""
+
+        if (time_limit, memory_limit) != self.key:
+            self.exit_stack.close()
+            self.key = (time_limit, memory_limit)
+            self.move_timer = self.exit_stack.enter_context(
+                limits.limited_time(time_limit)
+            )
+            self.memory_tracker = self.exit_stack.enter_context(
+                limits.limited_memory(memory_limit)
+            )
+
+        return self.move_timer, self.memory_tracker
+
+
+def serve(memory_limit, parent_pid, uid, gid):
+    """Load bots and play their moves as requested on stdin, writing responses
+    to stdout, until stdin is closed."""
+
+    # Keep hold of the real stdin and stdout for messages, and point the
+    # standard file descriptors at /dev/null, so that anything a bot prints
+    # doesn't get mixed up with the messages.
+    requests = os.fdopen(os.dup(0), "r")
+    responses = os.fdopen(os.dup(1), "w")
+    devnull = os.open(os.devnull, os.O_RDWR)
+    os.dup2(devnull, 0)
+    os.dup2(devnull, 1)
+    os.close(devnull)
+
+    drop_privileges(parent_pid, uid, gid)
+    set_resource_limits(memory_limit)
+
+    move_limits = MoveLimits()
+    fn = None
+    state = None
+
+    def send(message):
+        responses.write(json.dumps(message) + "\n")
+        responses.flush()
+
+    send({"maxrss": get_maxrss()})
+
+    for line in requests:
+        request = json.loads(line)
+
+        try:
+            if "code" in request:
+                # Each game gets a fresh module, so that no state can be carried
+                # between games
+                re.purge()
+                mod = loader.create_module_from_str("bot", request["code"])
+                fn = mod.get_next_move
+                state = None
+                send({"params": runner.get_param_list(fn), "maxrss": get_maxrss()})
+            else:
+                args = request["args"]
+                if "state" in args:
+                    args["state"] = state
+
+                move_timer, memory_tracker = move_limits.get(
+                    request["time_limit"], request["memory_limit"]
+                )
+                result_type, move, new_state, tb, opcode_count = runner.call_bot(
+                    fn, args, request["opcode_limit"], move_timer, memory_tracker
+                )
+                if result_type is None:
+                    state = new_state
+
+                send(move_to_json(result_type, move, new_state, tb, opcode_count))
+        except BaseException:
+            send({"error": traceback.format_exc()})
+
+
+if __name__ == "__main__":
+    uid, gid = [None if arg == "-1" else int(arg) for arg in sys.argv[3:5]]
+    serve(int(sys.argv[1]), int(sys.argv[2]), uid, gid)
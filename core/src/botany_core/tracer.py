@@ -1,52 +1,303 @@
+import contextlib
+import dis
 import sys
 from contextlib import contextmanager
 
 opcode_limit_supported = (sys.version_info.major, sys.version_info.minor) >= (3, 7)
 
+# From Python 3.12, trace functions installed with sys.settrace() no longer
+# reliably receive opcode events, so we use sys.monitoring where it is
+# available.
+#
+# Before 3.12, a Python function is still called for every opcode, so bots run
+# with an opcode limit are around 75x slower than without one, rather than
+# around 15x with sys.monitoring (see core/benchmarks/tracer_benchmark.py).
+# The server's runtime (server/runtime.txt) is 3.7, so it gets little benefit.
+use_monitoring = hasattr(sys, "monitoring")
+
+# sys.monitoring reserves ids 0, 1, 2, and 5 for debuggers, coverage tools,
+# profilers, and optimizers.
+MONITORING_TOOL_ID = 3
+
 
 class OpCodeLimitExceeded(Exception):
     pass
 
 
+class OpCodeCounter:
+    """Exposes the number of opcodes executed within a limited_opcodes() block.
+
+    For speed, the count itself lives in a closure in the function that does
+    the counting.
+    """
+
+    def __init__(self, limit, get_count):
+        self.opcode_limit = limit
+        self._get_count = get_count
+
+    @property
+    def opcode_count(self):
+        return self._get_count()
+
+
+_current_counter = None
+
+
 def build_tracer(limit):
+    """Return a trace function, for use with sys.settrace(), that raises
+    OpCodeLimitExceeded once more than limit opcodes have been executed.
+    """
+
+    count = 0
+
+    def local_tracer(frame, event, arg):
+        nonlocal count
+
+        if event == "opcode":
+            count += 1
+            if count > limit:
+                raise OpCodeLimitExceeded()
+        return local_tracer
+
     def tracer(frame, event, arg):
+        if id(frame.f_code) in _excluded_code_ids:
+            return None
+
+        # This is only called when a new frame is entered, so the frame's flags
+        # only need to be set once.
         frame.f_trace_opcodes = True
         frame.f_trace_lines = False
+        return local_tracer
 
-        if event == "opcode":
-            tracer.opcode_count += 1
-            if tracer.opcode_count > limit:
-                raise OpCodeLimitExceeded()
-        return tracer
+    def get_count():
+        return count
 
-    tracer.opcode_limit = limit
-    tracer.opcode_count = 0
+    tracer.counter = OpCodeCounter(limit, get_count)
     return tracer
 
 
+def build_monitoring_callbacks(limit):
+    """Return a dict mapping sys.monitoring events to callbacks that raise
+    OpCodeLimitExceeded once more than limit opcodes have been executed.
+
+    Rather than receiving an event for every opcode, the callbacks are called
+    whenever control enters a basic block, and add the number of opcodes in that
+    block to the count.  Exception handlers are counted when an exception is
+    caught, and when an exception is raised the rest of the block that raised it
+    is uncounted.
+
+    For code that doesn't raise exceptions, this gives the same count as tracing
+    every opcode, with far fewer callbacks.  When an exception propagates out of
+    a call, the rest of the calling block is still counted, so the count can be
+    slightly too high.  Note also that the bytecode, and so the count, for a
+    given function differs between versions of Python.
+    """
+
+    count = 0
+
+    def jump(code, src_offset, dest_offset):
+        nonlocal count
+
+        try:
+            block_sizes = _block_sizes_cache[id(code)][1]
+        except KeyError:
+            block_sizes = get_block_sizes(code)
+            _block_sizes_cache[id(code)] = (code, block_sizes)
+
+        count += block_sizes[dest_offset // 2]
+        if count > limit:
+            # As with sys.settrace(), once the exception has been raised, no
+            # more events are received.
+            sys.monitoring.set_events(MONITORING_TOOL_ID, 0)
+            raise OpCodeLimitExceeded()
+
+    def start(code, offset):
+        jump(code, None, offset)
+
+    def handled(code, offset, exception):
+        # Control enters the block at the start of an exception handler
+        jump(code, None, offset)
+
+    def raised(code, offset, exception):
+        nonlocal count
+
+        # The rest of the block containing offset was counted when the block was
+        # entered, but won't be executed
+        try:
+            block_sizes = _block_sizes_cache[id(code)][1]
+        except KeyError:
+            block_sizes = get_block_sizes(code)
+            _block_sizes_cache[id(code)] = (code, block_sizes)
+
+        remaining = block_sizes[offset // 2] - 1
+        if remaining > 0:
+            count -= remaining
+
+    def get_count():
+        return count
+
+    events = sys.monitoring.events
+    callbacks = {
+        events.PY_START: start,
+        events.PY_RESUME: start,
+        events.JUMP: jump,
+        events.RAISE: raised,
+        events.EXCEPTION_HANDLED: handled,
+    }
+
+    if hasattr(events, "BRANCH_LEFT"):
+        # Python 3.14+
+        callbacks[events.BRANCH_LEFT] = jump
+        callbacks[events.BRANCH_RIGHT] = jump
+    else:
+        callbacks[events.BRANCH] = jump
+
+    return callbacks, OpCodeCounter(limit, get_count)
+
+
+# Maps id(code) to (code, block_sizes).  We key by id rather than by code object
+# since hashing a code object is relatively slow, and keep a reference to the
+# code object so that its id can't be reused while it's in the cache.
+_block_sizes_cache = {}
+
+# Bots' code is recompiled for every game, so to avoid leaking memory the cache
+# is cleared when it gets too big.
+MAX_CACHED_CODE_OBJECTS = 10000
+
+# Code objects whose opcodes are not counted, and their ids.  See
+# exclude_from_count().
+_excluded_code_objects = []
+_excluded_code_ids = set()
+
+_BLOCK_ENDING_OPNAMES = [
+    "RETURN_VALUE",
+    "RETURN_CONST",
+    "RAISE_VARARGS",
+    "RERAISE",
+    "YIELD_VALUE",
+]
+
+_BLOCK_ENDING_OPCODES = set(dis.hasjrel) | set(dis.hasjabs)
+_BLOCK_ENDING_OPCODES |= {
+    dis.opmap[opname] for opname in _BLOCK_ENDING_OPNAMES if opname in dis.opmap
+}
+
+
+def get_block_sizes(code):
+    """Return list mapping (offset // 2) to the number of opcodes that are
+    executed from offset up to and including the end of the basic block that
+    contains offset.
+    """
+
+    block_sizes = [0] * (len(code.co_code) // 2 + 1)
+    block_size = 0
+
+    for instruction in reversed(list(dis.get_instructions(code))):
+        if instruction.opcode in _BLOCK_ENDING_OPCODES:
+            block_size = 0
+        block_size += 1
+        block_sizes[instruction.offset // 2] = block_size
+
+    return block_sizes
+
+
 @contextmanager
 def limited_opcodes(limit):
+    global _current_counter
+
+    original_counter = _current_counter
+
+    if use_monitoring:
+        counter, stop = _start_monitoring(limit)
+    else:
+        counter, stop = _start_settrace(limit)
+
+    _current_counter = counter
+
+    try:
+        yield counter
+    finally:
+        stop()
+        _current_counter = original_counter
+
+
+def _start_settrace(limit):
     original_tracer = sys.gettrace()
     tracer = build_tracer(limit)
     sys.settrace(tracer)
 
-    try:
-        yield tracer
-    finally:
+    def stop():
         sys.settrace(original_tracer)
 
+    return tracer.counter, stop
+
+
+def _start_monitoring(limit):
+    monitoring = sys.monitoring
+    callbacks, counter = build_monitoring_callbacks(limit)
+
+    if len(_block_sizes_cache) > MAX_CACHED_CODE_OBJECTS:
+        _block_sizes_cache.clear()
+        for code in _excluded_code_objects:
+            exclude_from_count(code)
+
+    # If limited_opcodes() calls are nested, the tool id will already be in use,
+    # and we restore the outer call's callbacks and events on exit.
+    is_outermost = monitoring.get_tool(MONITORING_TOOL_ID) != "botany"
+    if is_outermost:
+        monitoring.use_tool_id(MONITORING_TOOL_ID, "botany")
+
+    original_events = monitoring.get_events(MONITORING_TOOL_ID)
+    original_callbacks = {
+        event: monitoring.register_callback(MONITORING_TOOL_ID, event, callback)
+        for event, callback in callbacks.items()
+    }
+
+    def stop():
+        monitoring.set_events(MONITORING_TOOL_ID, original_events)
+        for event, callback in original_callbacks.items():
+            monitoring.register_callback(MONITORING_TOOL_ID, event, callback)
+        if is_outermost:
+            monitoring.free_tool_id(MONITORING_TOOL_ID)
+
+    exclude_from_count(stop.__code__)
+
+    event_set = 0
+    for event in callbacks:
+        event_set |= event
+    monitoring.set_events(MONITORING_TOOL_ID, event_set)
+
+    return counter, stop
+
+
+def exclude_from_count(code):
+    """Don't count opcodes in given code object.
+
+    This is used so that the code that runs when leaving a limited_opcodes()
+    block, or when entering and leaving a block nested inside it, doesn't count
+    towards the limit.  Opcodes in any functions called from the code object
+    are still counted.
+    """
+
+    if code not in _excluded_code_objects:
+        _excluded_code_objects.append(code)
+        _excluded_code_ids.add(id(code))
+    _block_sizes_cache[id(code)] = (code, [0] * (len(code.co_code) // 2 + 1))
+
+
+exclude_from_count(limited_opcodes.__wrapped__.__code__)
+exclude_from_count(contextlib._GeneratorContextManager.__exit__.__code__)
+
 
 def get_opcode_count():
-    tracer = sys.gettrace()
     try:
-        return tracer.opcode_count
+        return _current_counter.opcode_count
     except AttributeError:
         return None
 
 
 def get_opcode_limit():
-    tracer = sys.gettrace()
     try:
-        return tracer.opcode_limit
+        return _current_counter.opcode_limit
     except AttributeError:
         return None
@@ -1,11 +1,74 @@
 import ast
+import hashlib
+from collections import OrderedDict
+
+import attr
+
+from .ast_utils import NodeCounter
+
+# The number of analyses kept by analyse_bot_code()
+ANALYSIS_CACHE_SIZE = 128
+
+_analyses = OrderedDict()
 
 
 class InvalidBotCode(Exception):
     pass
 
 
+@attr.s
+class BotAnalysis:
+    """The result of analysing valid bot code.
+
+    Analyses are shared between callers, so tree must not be modified.
+    """
+
+    tree = attr.ib()
+    # Names of the parameters of get_next_move()
+    param_names = attr.ib()
+    # The number of nodes in the AST, counted by NodeCounter
+    node_count = attr.ib()
+    # Whether get_next_move() doesn't take a state parameter, and so can't
+    # remember anything between moves
+    is_goldfish = attr.ib()
+
+
 def verify_bot_code(code):
+    """Return BotAnalysis of given code, raising InvalidBotCode if the code
+    does not conform to the bot specification."""
+
+    return analyse_bot_code(code)
+
+
+def analyse_bot_code(code):
+    """Return BotAnalysis of given code, raising InvalidBotCode if the code
+    does not conform to the bot specification.
+
+    Analyses of recently seen code are memoized by a hash of the code, since the
+    same code is often checked several times (for instance when a bot is
+    submitted, and then when it is saved).
+    """
+
+    key = hashlib.sha256(code.encode()).digest()
+
+    try:
+        analysis = _analyses[key]
+    except KeyError:
+        pass
+    else:
+        _analyses.move_to_end(key)
+        return analysis
+
+    analysis = _analyse_bot_code(code)
+    _analyses[key] = analysis
+
+    if len(_analyses) > ANALYSIS_CACHE_SIZE:
+        _analyses.popitem(last=False)
+
+    return analysis
+
+
+def _analyse_bot_code(code):
     try:
         tree = ast.parse(code)
     except SyntaxError as e:
@@ -46,3 +109,13 @@ def verify_bot_code(code):
     if not found_get_next_move:
         msg = "Bot code does not define a function called get_next_move"
         raise InvalidBotCode(msg)
+
+    counter = NodeCounter()
+    counter.visit(tree)
+
+    return BotAnalysis(
+        tree=tree,
+        param_names=arg_names,
+        node_count=counter.count,
+        is_goldfish="state" not in arg_names,
+    )
@@ -0,0 +1,67 @@
+"""Benchmark the bitboard implementation of Connect Four.
+
+Compares playing random games with botany_connectfour.game and with
+botany_connectfour.bitboard, both directly (as the referee loop in
+botany_core.runner does) and with runner.run_game().
+
+Run with:
+
+    $ python games/connectfour/benchmarks/bitboard_benchmark.py
+"""
+
+import itertools
+import random
+import timeit
+
+from botany_connectfour import bitboard, game
+from botany_core import runner
+
+NUM_GAMES = 200
+
+
+def play_random_games(game_mod):
+    rng = random.Random(0)
+
+    for _ in range(NUM_GAMES):
+        board = game_mod.new_board()
+
+        for token in itertools.cycle(game_mod.TOKENS):
+            available_moves = game_mod.available_moves(board)
+            if available_moves == []:
+                break
+
+            game_mod.make_move(board, rng.choice(available_moves), token)
+
+            if game_mod.check_winner(board) is not None:
+                break
+
+
+def run_random_games(game_mod):
+    rng = random.Random(0)
+
+    def get_next_move(board):
+        return rng.choice([col for col in range(7) if board[col][-1] == "."])
+
+    for _ in range(NUM_GAMES):
+        runner.run_game(game_mod, get_next_move, get_next_move)
+
+
+def main():
+    for fn in [play_random_games, run_random_games]:
+        timings = {}
+
+        for game_mod in [game, bitboard]:
+            timings[game_mod] = min(
+                timeit.repeat(lambda: fn(game_mod), number=1, repeat=3)
+            )
+
+        print(f"{fn.__name__} ({NUM_GAMES} games):")
+        print(f"  list of lists: {timings[game] * 1000:8.1f} ms")
+        print(
+            f"  bitboard:      {timings[bitboard] * 1000:8.1f} ms"
+            f"  ({timings[game] / timings[bitboard]:.1f}x faster)"
+        )
+
+
+if __name__ == "__main__":
+    main()
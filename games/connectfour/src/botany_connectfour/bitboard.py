@@ -0,0 +1,148 @@
+# This module contains a faster implementation of the code used by Botany to
+# play Connect Four, with the same interface as botany_connectfour.game.
+#
+# Rather than a list of lists, a board is represented by a Board object, which
+# holds a pair of bitboards (one for each token) and the height of each column.
+#
+# In a bitboard, cell (col, row) is represented by bit (col * 7 + row).  The
+# extra bit at the top of each column is always zero, which stops lines of
+# four wrapping from the top of one column to the bottom of the next.
+#
+# Bots still receive the board as a list of lists, as described in
+# botany_connectfour.game.  The conversion is done by board_for_bot().
+
+from . import game
+
+# Some parameters
+N = game.N
+NROWS = game.NROWS
+NCOLS = game.NCOLS
+
+# Value representing an empty cell
+EMPTY = game.EMPTY
+
+# Tokens for bot1 and bot2
+TOKENS = game.TOKENS
+
+# The number of bits used for each column
+COL_HEIGHT = NROWS + 1
+
+# check_winner() looks for lines of four in each direction by shifting a
+# bitboard by the distance between adjacent cells in a line: 1 (vertical), 7
+# (horizontal), 6 (diagonal down), and 8 (diagonal up).
+
+
+class Board:
+    __slots__ = ["bitboards", "heights"]
+
+    def __init__(self, bitboards, heights):
+        self.bitboards = bitboards
+        self.heights = heights
+
+    def __deepcopy__(self, memo):
+        return copy_board(self)
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, Board)
+            and self.bitboards == other.bitboards
+            and self.heights == other.heights
+        )
+
+    def __repr__(self):
+        return f"Board({self.bitboards!r}, {self.heights!r})"
+
+
+def new_board():
+    """Return a new board"""
+    return Board([0, 0], [0] * NCOLS)
+
+
+def copy_board(board):
+    """Return a copy of `board`"""
+    return Board(board.bitboards[:], board.heights[:])
+
+
+def make_move(board, col, token):
+    """Update `board`, by dropping `token` in `col`"""
+    assert is_valid_move(board, col)
+    bit = 1 << (col * COL_HEIGHT + board.heights[col])
+    board.bitboards[TOKENS.index(token)] |= bit
+    board.heights[col] += 1
+
+
+def available_moves(board):
+    """Return list of columns which are not full."""
+    return [col for col, height in enumerate(board.heights) if height < NROWS]
+
+
+def is_valid_move(board, col):
+    """Return boolean indicating whether `col` is a valid move in `board`."""
+    return board.heights[col] < NROWS
+
+
+def check_winner(board):
+    """Return token (either "X" or "O") if there are four tokens in a row, or
+    None if there are no rows of four."""
+    for token, bitboard in zip(TOKENS, board.bitboards):
+        if has_four_in_a_row(bitboard):
+            return token
+
+    return None
+
+
+def check_winner_after(board, col, token):
+    """Return `token` if dropping it in `col` made four in a row, or None."""
+    if has_four_in_a_row(board.bitboards[TOKENS.index(token)]):
+        return token
+
+    return None
+
+
+def has_four_in_a_row(bitboard):
+    """Return boolean indicating whether there are four set bits in a row."""
+    # For each direction, bit n of pairs is set if cells n and n + shift are
+    # both set, so bit n of (pairs & (pairs >> 2 * shift)) is set if cells n,
+    # n + shift, n + 2 * shift, and n + 3 * shift are all set.
+    pairs = bitboard & (bitboard >> 1)
+    if pairs & (pairs >> 2):
+        return True
+
+    pairs = bitboard & (bitboard >> 7)
+    if pairs & (pairs >> 14):
+        return True
+
+    pairs = bitboard & (bitboard >> 6)
+    if pairs & (pairs >> 12):
+        return True
+
+    pairs = bitboard & (bitboard >> 8)
+    return bool(pairs & (pairs >> 16))
+
+
+def board_for_bot(board):
+    """Return representation of board, as a list of lists, to pass to bots."""
+    lists = [[EMPTY] * NROWS for _ in range(NCOLS)]
+
+    for token, bitboard in zip(TOKENS, board.bitboards):
+        for col in range(NCOLS):
+            column = bitboard >> (col * COL_HEIGHT)
+            for row in range(board.heights[col]):
+                if column & (1 << row):
+                    lists[col][row] = token
+
+    return lists
+
+
+def render_text(board):
+    """Return string suitable for printing board in terminal."""
+    return game.render_text(board_for_bot(board))
+
+
+def render_html(board):
+    """Return string suitable for displaying board in browser."""
+    return game.render_html(board_for_bot(board))
+
+
+# Used to style games on the website.
+html_styles = game.html_styles
@@ -31,6 +31,13 @@ for row in range(NROWS - N + 1):
         LINES_OF_4.append([(col + ix, row + ix) for ix in range(N)])
         LINES_OF_4.append([(col + ix, row + N - 1 - ix) for ix in range(N)])
 
+# A dict mapping each (col, row) pair to the lines of four that pass through
+# that cell.
+LINES_OF_4_THROUGH_CELL = {
+    (col, row): [line for line in LINES_OF_4 if (col, row) in line]
+    for col in range(NCOLS)
+    for row in range(NROWS)
+}
 
 # Value representing an empty cell
 EMPTY = "."
@@ -44,6 +51,11 @@ def new_board():
     return [[EMPTY for _ in range(NROWS)] for _ in range(NCOLS)]
 
 
+def copy_board(board):
+    """Return a copy of `board`"""
+    return [col[:] for col in board]
+
+
 def make_move(board, col, token):
     """Update `board`, by dropping `token` in `col`"""
     assert is_valid_move(board, col)
@@ -79,6 +91,27 @@ def check_winner(board):
     return None
 
 
+def check_winner_after(board, col, token):
+    """Return `token` if dropping it in `col` made four in a row, or None.
+
+    This is faster than check_winner(), since only the lines through the cell
+    that was just filled are checked."""
+    row = NROWS - 1
+    while board[col][row] == EMPTY:
+        row -= 1
+
+    for (c0, r0), (c1, r1), (c2, r2), (c3, r3) in LINES_OF_4_THROUGH_CELL[(col, row)]:
+        if (
+            board[c0][r0] == token
+            and board[c1][r1] == token
+            and board[c2][r2] == token
+            and board[c3][r3] == token
+        ):
+            return token
+
+    return None
+
+
 def render_text(board):
     """Return string suitable for printing board in terminal."""
     lines = []
@@ -89,6 +122,11 @@ def render_text(board):
 
 def render_html(board):
     """Return string suitable for displaying board in browser."""
+    if check_winner(board):
+        active_cols = []
+    else:
+        active_cols = available_moves(board)
+
     html = """
       <div class="connectfour-grid">
         <table>
@@ -100,7 +138,7 @@ def render_html(board):
         """
 
         for col in range(NCOLS):
-            if col in available_moves(board) and not check_winner(board):
+            if col in active_cols:
                 html += f'<td class="connectfour-col active" data-connectfourcol="{col}">{board[col][row]}</td>'
             else:
                 html += f'<td class="connectfour-col">{board[col][row]}</td>'
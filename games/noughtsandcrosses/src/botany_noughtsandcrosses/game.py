@@ -14,11 +14,18 @@ LINES_OF_3 = [
     [2, 4, 6],
 ]
 
+# Maps each position to the lines of three that pass through it
+LINES_THROUGH_POS = [[line for line in LINES_OF_3 if pos in line] for pos in range(9)]
+
 
 def new_board():
     return [EMPTY] * 9
 
 
+def copy_board(board):
+    return board[:]
+
+
 def make_move(board, pos, token):
     assert is_valid_move(board, pos)
     board[pos] = token
@@ -43,6 +50,14 @@ def check_winner(board):
     return None
 
 
+def check_winner_after(board, pos, token):
+    for line in LINES_THROUGH_POS[pos]:
+        if board[line[0]] == board[line[1]] == board[line[2]] == token:
+            return token
+
+    return None
+
+
 def render_html(board):
     return """
       <div class="noughtsandcrosses-grid">
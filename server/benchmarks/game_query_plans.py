@@ -0,0 +1,123 @@
+"""Show the query plans and timings for the hot queries against botany_game.
+
+To compare the plans with and without the indexes added in migration 0005,
+generate a large synthetic dataset, and run this before and after migrating:
+
+    $ python manage.py migrate
+    $ python manage.py gensampledata --num-bots 1000 --num-synthetic-games 1000000
+    $ python manage.py migrate botany 0004
+    $ python benchmarks/game_query_plans.py
+    $ python manage.py migrate botany 0005
+    $ python benchmarks/game_query_plans.py
+
+The queries are run through the same code as the views, and the plan of each
+SQL statement they execute is shown.
+
+This should be run from the server directory, with the same environment
+variables as manage.py.
+"""
+
+import os
+import sys
+import timeit
+
+import dotenv
+import django
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def get_queries():
+    """Return list of (name, fn) pairs, where fn runs the queries to measure."""
+
+    from botany import tournament
+    from botany.models import Bot, Game
+
+    bot = Bot.objects.active_bots().order_by("id").first()
+    other_bot = Bot.objects.active_bots().order_by("-id").first()
+
+    # A cursor half way through the bot's games, as if someone had paged back
+    games = Game.objects.all_against_bot(bot).order_by("-created_at", "-id")
+    middle_game = games[games.count() // 2]
+    before = (middle_game.created_at, middle_game.id)
+
+    return [
+        ("all_against_bot", lambda: list(Game.objects.all_against_bot(bot)[:100])),
+        (
+            "games_against_bot_page (first page)",
+            lambda: tournament.games_against_bot_page(bot, 100),
+        ),
+        (
+            "games_against_bot_page (with cursor)",
+            lambda: tournament.games_against_bot_page(bot, 100, before),
+        ),
+        (
+            "all_between_bots",
+            lambda: list(Game.objects.all_between_bots(bot, other_bot)),
+        ),
+        (
+            "num_games_by_pair_for_bot",
+            lambda: list(Game.objects.num_games_by_pair_for_bot(bot)),
+        ),
+        ("next_round_ix", lambda: Game.objects.next_round_ix(bot.id, other_bot.id)),
+        (
+            "games_between_active_or_house_bots",
+            lambda: list(
+                Game.objects.games_between_active_or_house_bots().values("id")
+            ),
+        ),
+        ("standings", lambda: list(tournament.standings())),
+    ]
+
+
+def capture_queries(fn):
+    """Run fn, returning list of (sql, params) for the queries it executes."""
+
+    from django.db import connection
+
+    queries = []
+
+    def record(execute, sql, params, many, context):
+        queries.append((sql, params))
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(record):
+        fn()
+
+    return queries
+
+
+def explain(sql, params):
+    from django.db import connection
+
+    prefix = connection.ops.explain_query_prefix()
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"{prefix} {sql}", params)
+        return "\n".join(" ".join(map(str, row)) for row in cursor.fetchall())
+
+
+def main():
+    dotenv.read_dotenv(".env")
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "botany.settings")
+    django.setup()
+
+    from botany.models import Bot, Game
+
+    number = 5
+
+    print(f"{Game.objects.count()} games, {Bot.objects.count()} bots")
+
+    for name, fn in get_queries():
+        elapsed = min(timeit.repeat(fn, number=number, repeat=3))
+
+        print()
+        print(f"{name}: {elapsed / number * 1000:.1f} ms")
+
+        # Show the plan of every query that fn runs, exactly as it was run
+        for sql, params in capture_queries(fn):
+            print(explain(sql, params))
+
+
+if __name__ == "__main__":
+    main()
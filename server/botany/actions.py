@@ -1,10 +1,21 @@
-from botany_core import loader, runner
+from botany_core import loader, runner, verifier
 from django.conf import settings
-from django.db import transaction
+from django.db import IntegrityError, transaction
+from django.db.models import Q
 
 from . import scheduler
-from .models import Bot, Game, User
-from .tournament import all_unplayed_games, unplayed_games_for_bot
+from .models import Bot, Game, MoveStats, User
+from .modulecache import bot_module_cache
+from .moves import encode_moves
+from .sandbox import sandbox_pool
+from .tournament import (
+    add_bot_to_standings,
+    all_unplayed_games,
+    lock_bots,
+    record_result_in_standings,
+    remove_bot_from_standings,
+    unplayed_games_for_bot,
+)
 
 
 def create_user(email_addr, name):
@@ -13,8 +24,11 @@ def create_user(email_addr, name):
 
 
 def deactivate_user(user):
+    active_bots = list(user.bots.active_bots())
     user.deactivate()
     user.bots.update(state="inactive")
+    for bot in active_bots:
+        remove_bot_from_standings(bot)
 
 
 def set_beginner_flag(user, is_beginner):
@@ -28,13 +42,22 @@ def create_house_bot(name, code):
     assert Bot.objects.exclude(state="house").count() == 0
 
     bot = Bot.objects.create(name=name, version=0, code=code, state="house")
+    add_bot_to_standings(bot)
     return bot
 
 
 def create_bot(user, name, code):
+    # Submitted code has just been verified, so its analysis is memoized
+    try:
+        analysis = verifier.analyse_bot_code(code)
+    except verifier.InvalidBotCode:
+        flags = {}
+    else:
+        flags = {"is_goldfish": analysis.is_goldfish, "code_size": analysis.node_count}
+
     version = user.bots.filter(name=name).count()
     bot = Bot.objects.create(
-        user=user, name=name, version=version, code=code, state="probation"
+        user=user, name=name, version=version, code=code, state="probation", **flags
     )
     schedule_games_against_house_bots(bot)
     return bot
@@ -43,8 +66,12 @@ def create_bot(user, name, code):
 def set_bot_active(bot, user):
     assert bot.is_under_probation or bot.is_inactive
     assert bot.user == user
+    previously_active_bots = list(user.bots.active_bots())
     user.bots.active_bots().update(state="inactive")
+    for previously_active_bot in previously_active_bots:
+        remove_bot_from_standings(previously_active_bot)
     bot.set_active()
+    add_bot_to_standings(bot)
     schedule_unplayed_games_for_bot(bot)
 
 
@@ -60,7 +87,7 @@ def schedule_games_against_house_bots(bot):
 
 def schedule_unplayed_games_for_bot(bot):
     assert bot.is_active
-    scheduler.schedule_games(unplayed_games_for_bot(bot))
+    scheduler.schedule_games(unplayed_games_for_bot(bot).items())
 
 
 def schedule_all_unplayed_games():
@@ -78,77 +105,250 @@ def play_games_between_house_bots():
                 if bot1 == bot2:
                     continue
 
-                for _ in range(settings.BOTANY_NUM_ROUNDS):
-                    result = play_game(bot1.id, bot2.id)
+                results = play_games(bot1.id, bot2.id, settings.BOTANY_NUM_ROUNDS)
+                for result in results:
                     assert result.is_complete
                     report_result(bot1.id, bot2.id, result)
 
 
 def play_games_against_house_bots(bot_id):
+    """Play all games between bot and the house bots, in this process.
+
+    scheduler.schedule_games_against_house_bots() instead enqueues a job for
+    each house bot, so that the games can be played in parallel.
+    """
+
     bot = Bot.objects.get(id=bot_id)
 
     assert bot.is_under_probation
 
-    house_bots = Bot.objects.house_bots()
-    for house_bot in house_bots:
-        for _ in range(settings.BOTANY_NUM_ROUNDS):
-            for bot1_id, bot2_id in [[bot.id, house_bot.id], [house_bot.id, bot.id]]:
-                result = play_game(bot1_id, bot2_id)
-                report_result(bot1_id, bot2_id, result)
+    for house_bot_id in Bot.objects.house_bots().values_list("id", flat=True):
+        play_games_against_house_bot(bot_id, house_bot_id)
+
+    activate_bot_if_probation_passed(bot_id)
+
+
+def play_games_against_house_bot(bot_id, house_bot_id):
+    """Play all games between bot, which is under probation, and one house bot.
+
+    If any game is not complete, the bot fails probation.  Once the games
+    against every house bot have been played, the bot is made active.
+
+    Games against each house bot may be played concurrently by several workers,
+    so the bot's state is checked before each game, and this returns early if
+    the bot has already failed probation in another worker.
+    """
+
+    for _ in range(settings.BOTANY_NUM_ROUNDS):
+        for bot1_id, bot2_id in [[bot_id, house_bot_id], [house_bot_id, bot_id]]:
+            if not Bot.objects.filter(id=bot_id, state="probation").exists():
+                return
+
+            result = play_game(bot1_id, bot2_id)
+
+            if result is None:
+                # All the games between these bots have already been played, by
+                # an earlier run of a job that was retried
+                continue
+
+            report_result(bot1_id, bot2_id, result)
+
+            if not result.is_complete:
+                with transaction.atomic():
+                    bot = Bot.objects.select_for_update().get(id=bot_id)
+                    if bot.is_under_probation:
+                        mark_bot_failed(bot)
+                return
 
-                if not result.is_complete:
-                    mark_bot_failed(bot)
-                    return
+    activate_bot_if_probation_passed(bot_id)
 
-    set_bot_active(bot, bot.user)
+
+def activate_bot_if_probation_passed(bot_id):
+    """Make bot active if it is under probation, and it has played all its games
+    against the house bots."""
+
+    with transaction.atomic():
+        bot = Bot.objects.select_for_update().get(id=bot_id)
+
+        if not bot.is_under_probation:
+            return
+
+        num_games_expected = (
+            2 * settings.BOTANY_NUM_ROUNDS * Bot.objects.house_bots().count()
+        )
+        num_games_played = Game.objects.filter(Q(bot1=bot) | Q(bot2=bot)).count()
+
+        if num_games_played < num_games_expected:
+            return
+
+        set_bot_active(bot, bot.user)
 
 
 def play_game_and_report_result(bot1_id, bot2_id):
     result = play_game(bot1_id, bot2_id)
 
-    report_result(bot1_id, bot2_id, result)
+    if result is not None:
+        report_result(bot1_id, bot2_id, result)
+
+
+def play_games_and_report_results(unplayed_games):
+    """Play and report the results of unplayed games.
+
+    unplayed_games is a list of ((bot1_id, bot2_id), num_games) pairs, as passed
+    to scheduler.schedule_games().
+    """
+
+    for (bot1_id, bot2_id), num_games in unplayed_games:
+        for result in play_games(bot1_id, bot2_id, num_games):
+            report_result(bot1_id, bot2_id, result)
 
 
 def play_game(bot1_id, bot2_id):
-    if (
-        Game.objects.filter(bot1_id=bot1_id, bot2_id=bot2_id).count()
-        == settings.BOTANY_NUM_ROUNDS
-    ):
-        return
+    """Play a game between bot1 and bot2, returning its result.
 
-    # TODO: run game in subprocess and ensure environment variables are not accessible
-    game = loader.load_module_from_dotted_path(settings.BOTANY_GAME_MODULE)
+    No game is played if settings.BOTANY_NUM_ROUNDS games between bot1 and bot2
+    have already been reported.
+    """
+
+    if Game.objects.next_round_ix(bot1_id, bot2_id) >= settings.BOTANY_NUM_ROUNDS:
+        return
 
-    bot1 = Bot.objects.get(id=bot1_id)
-    bot2 = Bot.objects.get(id=bot2_id)
+    bots = Bot.objects.in_bulk([bot1_id, bot2_id])
+    bot1 = bots[bot1_id]
+    bot2 = bots[bot2_id]
 
     if bot1.is_inactive or bot2.is_inactive:
         return
 
-    mod1 = loader.create_module_from_str("mod1", bot1.code)
-    mod2 = loader.create_module_from_str("mod2", bot2.code)
+    return run_games(bot1, bot2, 1)[0]
+
+
+def play_games(bot1_id, bot2_id, num_games):
+    """Play up to num_games games between bot1 and bot2, returning a list of
+    results.
+
+    Fewer than num_games games are played if that would take the number of games
+    between bot1 and bot2 above settings.BOTANY_NUM_ROUNDS.
+    """
+
+    num_games = min(
+        num_games,
+        settings.BOTANY_NUM_ROUNDS - Game.objects.next_round_ix(bot1_id, bot2_id),
+    )
+
+    if num_games <= 0:
+        return []
+
+    bots = Bot.objects.in_bulk([bot1_id, bot2_id])
+    bot1 = bots[bot1_id]
+    bot2 = bots[bot2_id]
+
+    if bot1.is_inactive or bot2.is_inactive:
+        return []
+
+    return run_games(bot1, bot2, num_games)
+
+
+def run_games(bot1, bot2, num_games):
+    """Play num_games games between bot1 and bot2, returning a list of results.
+
+    Unless settings.USE_SANDBOX is False, the games are played in a sandboxed
+    subprocess, so that bots can't get at the environment of this process.
+    """
 
-    return runner.run_game(
+    if settings.USE_SANDBOX:
+        return sandbox_pool.run_games(
+            bot1.code,
+            bot2.code,
+            num_games,
+            opcode_limit=settings.BOTANY_OPCODE_LIMIT,
+            time_limit=settings.BOTANY_MOVE_TIME_LIMIT,
+            memory_limit=settings.BOTANY_MOVE_MEMORY_LIMIT,
+            collect_stats=True,
+        )
+
+    game = loader.load_module_from_dotted_path(settings.BOTANY_GAME_MODULE)
+
+    # Each game gets fresh modules, created from the cached code objects
+    return runner.run_games(
         game,
-        mod1.get_next_move,
-        mod2.get_next_move,
+        lambda: bot_module_cache.create_module("mod1", bot1).get_next_move,
+        lambda: bot_module_cache.create_module("mod2", bot2).get_next_move,
+        num_games,
         opcode_limit=settings.BOTANY_OPCODE_LIMIT,
+        time_limit=settings.BOTANY_MOVE_TIME_LIMIT,
+        memory_limit=settings.BOTANY_MOVE_MEMORY_LIMIT,
+        collect_stats=True,
     )
 
 
-def report_result(bot1_id, bot2_id, result):
-    if (
-        Game.objects.filter(bot1_id=bot1_id, bot2_id=bot2_id).count()
-        == settings.BOTANY_NUM_ROUNDS
-    ):
+def record_move_stats(bot1_id, bot2_id, result):
+    """Add opcode counts and timings of moves in game between bot1 and bot2 to
+    the bots' MoveStats.
+
+    There are no stats if the game was played without collecting them, or if it
+    ended with a sandbox worker being killed.
+    """
+
+    if result.move_times is None:
         return
 
-    moves = "".join(str(move) for move in result.move_list)
-    Game.objects.create(
-        bot1_id=bot1_id,
-        bot2_id=bot2_id,
-        score=result.score,
-        moves=moves,
-        result_type=result.result_type.value,
-        traceback=result.traceback,
+    # bot1 always moves first, and the bots take turns
+    MoveStats.objects.record(
+        bot1_id, result.opcode_counts[0::2], result.move_times[0::2]
+    )
+    MoveStats.objects.record(
+        bot2_id, result.opcode_counts[1::2], result.move_times[1::2]
     )
+
+
+REPORT_RESULT_ATTEMPTS = 5
+
+
+def report_result(bot1_id, bot2_id, result):
+    """Record result of a game between bot1 and bot2, unless
+    settings.BOTANY_NUM_ROUNDS games between them have already been reported.
+
+    The game is given the next round_ix for the pair of bots.  If another worker
+    reports a game for the pair at the same time, one of the inserts will
+    violate the unique constraint on (bot1, bot2, round_ix), and that worker
+    will try again with the following round_ix, up to REPORT_RESULT_ATTEMPTS
+    times.
+    """
+
+    moves = encode_moves(result.move_list)
+
+    for attempt in range(REPORT_RESULT_ATTEMPTS):
+        round_ix = Game.objects.next_round_ix(bot1_id, bot2_id)
+
+        if round_ix >= settings.BOTANY_NUM_ROUNDS:
+            return
+
+        try:
+            with transaction.atomic():
+                # Lock the bots before creating the game.  On PostgreSQL, the
+                # game's foreign keys take share locks on the bots, and
+                # upgrading those afterwards could deadlock with another worker.
+                lock_bots([bot1_id, bot2_id])
+                Game.objects.create(
+                    bot1_id=bot1_id,
+                    bot2_id=bot2_id,
+                    round_ix=round_ix,
+                    score=result.score,
+                    moves=moves,
+                    result_type=result.result_type.value,
+                    traceback=result.traceback,
+                )
+                record_result_in_standings(bot1_id, bot2_id, result.score)
+                record_move_stats(bot1_id, bot2_id, result)
+        except IntegrityError:
+            # Only retry if the error was caused by another game taking this
+            # round_ix.
+            round_taken = Game.objects.filter(
+                bot1_id=bot1_id, bot2_id=bot2_id, round_ix=round_ix
+            ).exists()
+            if not round_taken or attempt == REPORT_RESULT_ATTEMPTS - 1:
+                raise
+            continue
+
+        return
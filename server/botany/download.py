@@ -1,7 +1,13 @@
+import hashlib
 import io
+import os
 import re
+import tempfile
 import zipfile
 
+from django.conf import settings
+from django.db.models import Count, Max
+
 from .models import Bot
 
 
@@ -30,26 +36,124 @@ def get_bots():
 
         return f"{file_name} ({num}).{file_extension}"
 
+    # Rows are fetched with .iterator() so that only one bot's code needs to be
+    # held in memory at once.
     bots_info = Bot.objects.filter(
         state__in=["active", "house"]
-    ).values_list("name", "code")
+    ).values_list("name", "code").iterator()
 
-    bots_to_return = {}
+    names = set()
     for name, code in bots_info:
-        while name in bots_to_return:
+        while name in names:
             name = increment_name(name)
-        bots_to_return[name] = code
-
-    return bots_to_return.items()
+        names.add(name)
+        yield name, code
 
 
 def get_active_bots():
-    bots = get_bots()
-
     zip_buffer = io.BytesIO()
 
-    with zipfile.ZipFile(zip_buffer, "x") as zip_file:
+    for chunk in generate_zip(get_bots()):
+        zip_buffer.write(chunk)
+
+    zip_buffer.seek(0)
+    return zip_buffer
+
+
+def generate_zip(bots):
+    """Yield chunks of bytes of a ZIP file containing given bots.
+
+    Each bot is written to the ZIP file as soon as it is received, so only the
+    current bot's code is held in memory.
+    """
+
+    buffer = StreamBuffer()
+
+    with zipfile.ZipFile(buffer, "w") as zip_file:
         for name, code in bots:
             zip_file.writestr(name, code)
+            yield buffer.read_all()
 
-    return zip_buffer
+    yield buffer.read_all()
+
+
+class StreamBuffer:
+    """A write-only file-like object, which ZipFile can write to when generating
+    a ZIP file in chunks.
+
+    ZipFile can write to unseekable files, so this doesn't implement seek() or
+    tell().
+    """
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def read_all(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def get_bots_zip_path():
+    """Return (path, etag) for a ZIP file containing the active bots' code,
+    creating the file if necessary.
+
+    Once the tournament has closed, the set of active bots doesn't change, so
+    the file only needs to be created once.  The file is named after a
+    fingerprint of the active bots, which is also used as its ETag.
+    """
+
+    fingerprint = get_bots_fingerprint()
+    cache_dir = settings.BOTS_ZIP_CACHE_DIR
+    path = os.path.join(cache_dir, f"bots-{fingerprint}.zip")
+
+    if not os.path.exists(path):
+        os.makedirs(cache_dir, exist_ok=True)
+
+        # Write to a temporary file and then rename it, so that concurrent
+        # requests never see a partially written file.
+        with tempfile.NamedTemporaryFile(dir=cache_dir, delete=False) as f:
+            try:
+                for chunk in generate_zip(get_bots()):
+                    f.write(chunk)
+            except BaseException:
+                os.unlink(f.name)
+                raise
+
+        os.replace(f.name, path)
+        remove_superseded_zips(cache_dir, path)
+
+    return path, fingerprint
+
+
+def remove_superseded_zips(cache_dir, path):
+    """Remove ZIP files in cache_dir other than the one at path.
+
+    Requests that are still streaming a removed file can carry on reading it.
+    """
+
+    for filename in os.listdir(cache_dir):
+        other_path = os.path.join(cache_dir, filename)
+        if other_path != path and re.match(r"bots-[0-9a-f]+\.zip$", filename):
+            try:
+                os.unlink(other_path)
+            except FileNotFoundError:
+                pass
+
+
+def get_bots_fingerprint():
+    """Return string that changes whenever the set of active bots changes."""
+
+    stats = Bot.objects.filter(state__in=["active", "house"]).aggregate(
+        num_bots=Count("id"), max_id=Max("id"), max_updated_at=Max("updated_at")
+    )
+
+    data = f"{stats['num_bots']}:{stats['max_id']}:{stats['max_updated_at']}"
+    return hashlib.sha1(data.encode()).hexdigest()
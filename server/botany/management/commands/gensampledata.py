@@ -7,16 +7,43 @@ from django.test import override_settings
 
 from botany.tests import factories
 
-from ... import actions
+from ... import actions, tournament
+from ...models import Bot, Game
+from ...moves import encode_moves
+
+BATCH_SIZE = 10000
 
 
 class Command(BaseCommand):
+    def add_arguments(self, parser):
+        parser.add_argument("--num-bots", type=int, default=20)
+        parser.add_argument(
+            "--num-synthetic-games",
+            type=int,
+            default=0,
+            help="Instead of playing games, create this many games with random "
+            "results between active bots (for benchmarking queries)",
+        )
+
     def handle(self, *args, **kwargs):
+        num_bots = kwargs["num_bots"]
+        num_synthetic_games = kwargs["num_synthetic_games"]
+
         with transaction.atomic():
             with override_settings(USE_QUEUES=False):
                 for _ in range(4):
                     factories.create_house_bot()
-                bots = [factories.create_bot(state="probation") for _ in range(20)]
+
+                if num_synthetic_games:
+                    for _ in range(num_bots):
+                        factories.create_bot()
+                    self.create_synthetic_games(num_synthetic_games)
+                    tournament.rebuild_standings()
+                    return
+
+                bots = [
+                    factories.create_bot(state="probation") for _ in range(num_bots)
+                ]
 
             for bot1 in bots:
                 actions.play_games_against_house_bots(bot1.id)
@@ -28,3 +55,30 @@ class Command(BaseCommand):
                     for _ in range(random.randint(0, settings.BOTANY_NUM_ROUNDS)):
                         result = actions.play_game(bot1.id, bot2.id)
                         actions.report_result(bot1.id, bot2.id, result)
+
+    def create_synthetic_games(self, num_games):
+        bot_ids = [bot.id for bot in Bot.objects.active_or_house_bots()]
+        round_ixs = {}
+        games = []
+
+        for _ in range(num_games):
+            bot1_id, bot2_id = random.sample(bot_ids, 2)
+            round_ix = round_ixs.get((bot1_id, bot2_id), 0)
+            round_ixs[(bot1_id, bot2_id)] = round_ix + 1
+
+            games.append(
+                Game(
+                    bot1_id=bot1_id,
+                    bot2_id=bot2_id,
+                    score=random.choice([-1, 0, 1]),
+                    moves=encode_moves(random.sample(range(9), 7)),
+                    result_type="complete",
+                    round_ix=round_ix,
+                )
+            )
+
+            if len(games) == BATCH_SIZE:
+                Game.objects.bulk_create(games)
+                games = []
+
+        Game.objects.bulk_create(games)
@@ -0,0 +1,86 @@
+from django.conf import settings
+from django.core.management import BaseCommand
+from django.db.models import Sum
+
+from ...models import MoveStats
+
+
+class Command(BaseCommand):
+    help = (
+        "Show the bots that take up the most worker time, and the bots that are "
+        "closest to the opcode limit, with warnings for bots over the thresholds"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--num-bots", type=int, default=10)
+        parser.add_argument(
+            "--time-share-warning",
+            type=float,
+            default=0.25,
+            help="Warn about bots that take more than this fraction of the total "
+            "time spent on moves",
+        )
+        parser.add_argument(
+            "--opcode-warning",
+            type=float,
+            default=0.9,
+            help="Warn about bots whose largest move used more than this fraction "
+            "of BOTANY_OPCODE_LIMIT",
+        )
+
+    def handle(self, *args, **kwargs):
+        num_bots = kwargs["num_bots"]
+        time_share_warning = kwargs["time_share_warning"]
+        opcode_warning = kwargs["opcode_warning"]
+        opcode_limit = settings.BOTANY_OPCODE_LIMIT
+
+        all_stats = MoveStats.objects.select_related("bot__user")
+        total_time = all_stats.aggregate(total=Sum("total_move_time"))["total"]
+
+        if not total_time:
+            print("No moves recorded")
+            return
+
+        warnings = []
+
+        print("Bots by time spent on moves:")
+        for stats in all_stats.order_by("-total_move_time")[:num_bots]:
+            share = stats.total_move_time / total_time
+            mean_time = stats.total_move_time / stats.num_moves
+            print(
+                f"  {describe_bot(stats.bot)} :: {stats.total_move_time:.2f}s "
+                f"({share:.1%}) :: mean {mean_time * 1000:.2f}ms :: "
+                f"max {stats.max_move_time * 1000:.2f}ms"
+            )
+
+        for stats in all_stats.filter(
+            total_move_time__gt=total_time * time_share_warning
+        ):
+            share = stats.total_move_time / total_time
+            warnings.append(
+                f"{describe_bot(stats.bot)} took {share:.1%} of the time spent on "
+                "moves"
+            )
+
+        print()
+        print("Bots by largest number of opcodes in a move:")
+        for stats in all_stats.order_by("-max_opcodes")[:num_bots]:
+            mean_opcodes = stats.total_opcodes / stats.num_moves
+            print(
+                f"  {describe_bot(stats.bot)} :: {stats.max_opcodes} "
+                f"({stats.max_opcodes / opcode_limit:.1%} of limit) :: "
+                f"mean {mean_opcodes:.0f}"
+            )
+
+        for stats in all_stats.filter(max_opcodes__gt=opcode_limit * opcode_warning):
+            warnings.append(
+                f"{describe_bot(stats.bot)} used {stats.max_opcodes} opcodes in a "
+                f"move ({stats.max_opcodes / opcode_limit:.1%} of limit)"
+            )
+
+        for warning in warnings:
+            self.stderr.write(f"WARNING: {warning}")
+
+
+def describe_bot(bot):
+    return f"{bot.user_name()} :: {bot.name_and_version()}"
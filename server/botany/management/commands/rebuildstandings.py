@@ -0,0 +1,9 @@
+from django.core.management import BaseCommand
+
+from ... import tournament
+
+
+class Command(BaseCommand):
+    def handle(self, *args, **kwargs):
+        tournament.rebuild_standings()
+        print("Rebuilt standings")
@@ -1,6 +1,17 @@
 from django.contrib.auth.base_user import BaseUserManager
-from django.db import models
-from django.db.models import Q
+from django.db import IntegrityError, models, transaction
+from django.db.models import (
+    Count,
+    F,
+    Func,
+    IntegerField,
+    Max,
+    OuterRef,
+    Q,
+    Subquery,
+    Value,
+)
+from django.db.models.functions import Coalesce, Greatest
 from django.utils.crypto import get_random_string
 
 
@@ -45,6 +56,43 @@ class BotManager(models.Manager):
     def active_or_house_bots(self):
         return self.filter(state__in=["active", "house"])
 
+    def with_stats(self):
+        """Return queryset of bots annotated with num_played, num_wins,
+        num_draws, num_losses, and score, which are calculated from all the
+        games each bot has played.
+
+        The annotations populate the corresponding properties on Bot, which
+        would otherwise each run two queries.  Each annotation is a subquery,
+        rather than an aggregate over joins with both bot1_games and
+        bot2_games, which would count each game many times over.
+        """
+
+        from .models import Game
+
+        def count_games(**kwargs):
+            # SELECT COUNT(*) FROM botany_game WHERE ... (without a GROUP BY)
+            games = (
+                Game.objects.filter(**kwargs)
+                .order_by()
+                .annotate(count=Func(F("id"), function="COUNT"))
+                .values("count")
+            )
+            return Coalesce(Subquery(games, output_field=IntegerField()), 0)
+
+        def count_games_by_score(bot1_score):
+            bot1_games = count_games(bot1=OuterRef("pk"), score=bot1_score)
+            bot2_games = count_games(bot2=OuterRef("pk"), score=-bot1_score)
+            return bot1_games + bot2_games
+
+        num_played = count_games(bot1=OuterRef("pk")) + count_games(bot2=OuterRef("pk"))
+
+        return self.annotate(
+            num_played=num_played,
+            num_wins=count_games_by_score(1),
+            num_draws=count_games_by_score(0),
+            num_losses=count_games_by_score(-1),
+        ).annotate(score=F("num_wins") - F("num_losses"))
+
 
 class GameManager(models.Manager):
     def games_between_active_bots(self):
@@ -55,16 +103,83 @@ class GameManager(models.Manager):
             bot1__state__in=["active", "house"], bot2__state__in=["active", "house"]
         )
 
+    def next_round_ix(self, bot1_id, bot2_id):
+        """Return round_ix for the next game between bot1 and bot2."""
+
+        max_round_ix = self.filter(bot1_id=bot1_id, bot2_id=bot2_id).aggregate(
+            max_round_ix=Max("round_ix")
+        )["max_round_ix"]
+
+        if max_round_ix is None:
+            return 0
+        return max_round_ix + 1
+
+    def num_games_by_pair_for_bot(self, bot):
+        """Return queryset of (bot1_id, bot2_id, num_games) tuples, one for each
+        pair of bots that have played a game, where given bot is bot1 or bot2."""
+        return (
+            self.filter(Q(bot1=bot) | Q(bot2=bot))
+            .order_by()
+            .values_list("bot1_id", "bot2_id")
+            .annotate(num_games=Count("id"))
+        )
+
+    def with_bots(self):
+        """Return queryset of games that also fetches both bots and their users,
+        for use when listing games."""
+        return self.select_related("bot1__user", "bot2__user")
+
     def all_against_bot(self, bot):
-        return self.filter(Q(bot1=bot) | Q(bot2=bot)).order_by("-created_at")
+        return (
+            self.with_bots()
+            .filter(Q(bot1=bot) | Q(bot2=bot))
+            .order_by("-created_at", "-id")
+        )
 
     def all_between_bots(self, bot1, bot2):
-        return self.filter(
-            (Q(bot1=bot1) & Q(bot2=bot2)) | (Q(bot1=bot2) & Q(bot2=bot1))
-        ).order_by("-created_at")
+        return (
+            self.with_bots()
+            .filter((Q(bot1=bot1) & Q(bot2=bot2)) | (Q(bot1=bot2) & Q(bot2=bot1)))
+            .order_by("-created_at", "-id")
+        )
 
     def recent(self, n):
-        return self.order_by("-created_at")[:n]
+        return self.with_bots().order_by("-created_at", "-id")[:n]
 
     def recent_against_bot(self, bot, n):
-        return self.filter(Q(bot1=bot) | Q(bot2=bot)).order_by("-created_at")[:n]
+        return self.all_against_bot(bot)[:n]
+
+
+class MoveStatsManager(models.Manager):
+    def record(self, bot_id, opcode_counts, move_times):
+        """Add the opcode counts and times of a bot's moves in a game to the
+        bot's MoveStats, creating them if necessary."""
+
+        if not move_times:
+            return
+
+        fields = {
+            "num_moves": len(move_times),
+            "total_opcodes": sum(opcode_counts),
+            "max_opcodes": max(opcode_counts, default=0),
+            "total_move_time": sum(move_times),
+            "max_move_time": max(move_times),
+        }
+
+        updates = {
+            "num_moves": F("num_moves") + fields["num_moves"],
+            "total_opcodes": F("total_opcodes") + fields["total_opcodes"],
+            "max_opcodes": Greatest("max_opcodes", Value(fields["max_opcodes"])),
+            "total_move_time": F("total_move_time") + fields["total_move_time"],
+            "max_move_time": Greatest("max_move_time", Value(fields["max_move_time"])),
+        }
+
+        if self.filter(bot_id=bot_id).update(**updates):
+            return
+
+        try:
+            with transaction.atomic():
+                self.create(bot_id=bot_id, **fields)
+        except IntegrityError:
+            # Another worker created them first
+            self.filter(bot_id=bot_id).update(**updates)
@@ -0,0 +1,77 @@
+# Generated by Django 2.1 on 2026-10-18 02:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_standings(apps, schema_editor):
+    """Create a Standing for each active or house bot, from its games against
+    other active or house bots.
+
+    This doesn't call tournament.rebuild_standings(), so that it keeps working
+    with the historical models if the app changes.
+    """
+
+    Bot = apps.get_model("botany", "Bot")
+    Game = apps.get_model("botany", "Game")
+    Standing = apps.get_model("botany", "Standing")
+
+    states = ["active", "house"]
+    standings = {
+        bot_id: Standing(bot_id=bot_id)
+        for bot_id in Bot.objects.filter(state__in=states).values_list("id", flat=True)
+    }
+
+    num_games_by_pair_and_score = (
+        Game.objects.filter(bot1__state__in=states, bot2__state__in=states)
+        .order_by()
+        .values_list("bot1_id", "bot2_id", "score")
+        .annotate(num_games=Count("id"))
+    )
+
+    for bot1_id, bot2_id, score, num_games in num_games_by_pair_and_score:
+        for bot_id, bot_score in [(bot1_id, score), (bot2_id, -score)]:
+            standing = standings[bot_id]
+            standing.num_played += num_games
+            if bot_score == 1:
+                standing.num_wins += num_games
+            elif bot_score == 0:
+                standing.num_draws += num_games
+            else:
+                standing.num_losses += num_games
+            standing.score += bot_score * num_games
+
+    Standing.objects.bulk_create(standings.values())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("botany", "0002_auto_20180918_1508")]
+
+    operations = [
+        migrations.CreateModel(
+            name="Standing",
+            fields=[
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "bot",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="standing",
+                        serialize=False,
+                        to="botany.Bot",
+                    ),
+                ),
+                ("num_played", models.IntegerField(default=0)),
+                ("num_wins", models.IntegerField(default=0)),
+                ("num_draws", models.IntegerField(default=0)),
+                ("num_losses", models.IntegerField(default=0)),
+                ("score", models.IntegerField(default=0)),
+            ],
+            options={"abstract": False},
+        ),
+        migrations.RunPython(populate_standings, migrations.RunPython.noop),
+    ]
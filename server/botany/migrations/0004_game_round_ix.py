@@ -0,0 +1,35 @@
+# Generated by Django 2.1 on 2026-10-18 02:31
+
+from django.db import migrations, models
+
+# Number existing games between each pair of bots in the order they were reported
+NUMBER_GAMES_SQL = """
+UPDATE botany_game
+SET round_ix = numbered.round_ix
+FROM (
+    SELECT
+        id,
+        ROW_NUMBER() OVER (PARTITION BY bot1_id, bot2_id ORDER BY id) - 1
+        AS round_ix
+    FROM botany_game
+) AS numbered
+WHERE botany_game.id = numbered.id
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("botany", "0003_standing")]
+
+    operations = [
+        migrations.AddField(
+            model_name="game", name="round_ix", field=models.IntegerField(null=True)
+        ),
+        migrations.RunSQL(NUMBER_GAMES_SQL, migrations.RunSQL.noop),
+        migrations.AlterField(
+            model_name="game", name="round_ix", field=models.IntegerField()
+        ),
+        migrations.AlterUniqueTogether(
+            name="game", unique_together={("bot1", "bot2", "round_ix")}
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 2.1 on 2026-10-18 02:25
+
+from django.db import migrations, models
+
+# Only a handful of bots are active or house bots at any time, so a partial
+# index on just those bots is small, and is used by the standings queries and
+# by GameManager.games_between_active_or_house_bots().  Django 2.1's Index
+# doesn't support conditions, so this is created with raw SQL.
+CREATE_BOT_STATE_INDEX_SQL = """
+CREATE INDEX botany_bot_active_or_house_idx ON botany_bot (state)
+WHERE state IN ('active', 'house')
+"""
+
+DROP_BOT_STATE_INDEX_SQL = "DROP INDEX botany_bot_active_or_house_idx"
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("botany", "0004_game_round_ix")]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="game",
+            index=models.Index(
+                fields=["bot1", "created_at", "id"], name="botany_game_bot1_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="game",
+            index=models.Index(
+                fields=["bot2", "created_at", "id"], name="botany_game_bot2_created_idx"
+            ),
+        ),
+        migrations.RunSQL(CREATE_BOT_STATE_INDEX_SQL, DROP_BOT_STATE_INDEX_SQL),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 2.1 on 2026-10-18 02:40
+
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def convert_moves(apps, schema_editor, old_field, new_field, convert):
+    """Set new_field to convert(old_field) on every game, updating a batch of
+    games at a time."""
+
+    Game = apps.get_model("botany", "Game")
+    games = Game.objects.order_by("id").values_list("id", old_field)
+    sql = f"UPDATE botany_game SET {new_field} = %s WHERE id = %s"
+    last_id = 0
+
+    with schema_editor.connection.cursor() as cursor:
+        while True:
+            batch = list(games.filter(id__gt=last_id)[:BATCH_SIZE])
+            if not batch:
+                return
+
+            cursor.executemany(
+                sql, [(convert(moves), game_id) for game_id, moves in batch]
+            )
+            last_id = batch[-1][0]
+
+
+def encode_moves(apps, schema_editor):
+    # Each move was stored as a single digit.  Moves less than 128 are encoded
+    # as a single byte, so this matches botany.moves.encode_moves().
+    convert_moves(
+        apps,
+        schema_editor,
+        "moves",
+        "packed_moves",
+        lambda moves: bytes(int(c) for c in moves),
+    )
+
+
+def decode_moves(apps, schema_editor):
+    convert_moves(
+        apps,
+        schema_editor,
+        "packed_moves",
+        "moves",
+        lambda moves: "".join(str(move) for move in bytes(moves)),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("botany", "0005_game_indexes")]
+
+    operations = [
+        migrations.AddField(
+            model_name="game",
+            name="packed_moves",
+            field=models.BinaryField(null=True),
+        ),
+        migrations.AlterField(
+            model_name="game",
+            name="moves",
+            field=models.CharField(max_length=255, null=True),
+        ),
+        migrations.RunPython(encode_moves, decode_moves),
+        migrations.RemoveField(model_name="game", name="moves"),
+        migrations.RenameField(
+            model_name="game", old_name="packed_moves", new_name="moves"
+        ),
+        migrations.AlterField(
+            model_name="game", name="moves", field=models.BinaryField()
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 2.1 on 2026-10-18 02:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("botany", "0006_game_moves_binary")]
+
+    operations = [
+        migrations.CreateModel(
+            name="MoveStats",
+            fields=[
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "bot",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="move_stats",
+                        serialize=False,
+                        to="botany.Bot",
+                    ),
+                ),
+                ("num_moves", models.IntegerField(default=0)),
+                ("total_opcodes", models.BigIntegerField(default=0)),
+                ("max_opcodes", models.BigIntegerField(default=0)),
+                ("total_move_time", models.FloatField(default=0)),
+                ("max_move_time", models.FloatField(default=0)),
+            ],
+            options={"abstract": False},
+        ),
+    ]
@@ -1,10 +1,9 @@
-import ast
-
+from botany_core import verifier
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin
 from django.db import models
 
 from . import managers
-from .ast_utils import NodeCounter
+from .moves import decode_moves
 
 
 class AbstractBotanyModel(models.Model):
@@ -184,19 +183,11 @@ class Bot(AbstractBotanyModel):
         self._num_losses = num_losses
 
     def set_flags_etc(self):
-        tree = ast.parse(self.code)
-
-        for stmt in tree.body:
-            if isinstance(stmt, ast.FunctionDef):
-                if stmt.name == "get_next_move":
-                    args = stmt.args
-                    arg_names = [arg.arg for arg in args.args + args.kwonlyargs]
-                    self.is_goldfish = "state" not in arg_names
-                    break
-
-        counter = NodeCounter()
-        counter.visit(tree)
-        self.code_size = counter.count
+        # These are set when the bot is created, but not for older bots
+        if self.is_goldfish is None or self.code_size is None:
+            analysis = verifier.analyse_bot_code(self.code)
+            self.is_goldfish = analysis.is_goldfish
+            self.code_size = analysis.node_count
 
         self.is_one_hit_wonder = self.user.bots.count() == 1
         self.is_from_beginner = bool(self.user.is_beginner)
@@ -204,16 +195,74 @@ class Bot(AbstractBotanyModel):
         self.save()
 
 
+class Standing(AbstractBotanyModel):
+    """Results of games played by an active or house bot against other active or
+    house bots.
+
+    This is maintained by the functions in tournament.py as results are reported
+    and as bots change state, so that the standings don't have to be calculated
+    from every game each time they're displayed.
+    """
+
+    bot = models.OneToOneField(
+        Bot, related_name="standing", on_delete=models.CASCADE, primary_key=True
+    )
+    num_played = models.IntegerField(default=0)
+    num_wins = models.IntegerField(default=0)
+    num_draws = models.IntegerField(default=0)
+    num_losses = models.IntegerField(default=0)
+    score = models.IntegerField(default=0)
+
+
+class MoveStats(AbstractBotanyModel):
+    """Aggregate opcode counts and timings of the moves a bot has made in
+    reported games, for spotting bots that are close to BOTANY_OPCODE_LIMIT or
+    that take up a lot of worker time.
+
+    Times are wall-clock seconds.
+    """
+
+    bot = models.OneToOneField(
+        Bot, related_name="move_stats", on_delete=models.CASCADE, primary_key=True
+    )
+    num_moves = models.IntegerField(default=0)
+    total_opcodes = models.BigIntegerField(default=0)
+    max_opcodes = models.BigIntegerField(default=0)
+    total_move_time = models.FloatField(default=0)
+    max_move_time = models.FloatField(default=0)
+
+    objects = managers.MoveStatsManager()
+
+
 class Game(AbstractBotanyModel):
     bot1 = models.ForeignKey(Bot, related_name="bot1_games", on_delete=models.CASCADE)
     bot2 = models.ForeignKey(Bot, related_name="bot2_games", on_delete=models.CASCADE)
     score = models.IntegerField()
-    moves = models.CharField(max_length=255)
+    # Encoded with botany.moves.encode_moves()
+    moves = models.BinaryField()
     result_type = models.CharField(max_length=25)
     traceback = models.TextField(null=True)
+    # The number of games between bot1 and bot2 that were reported before this
+    # one.  The unique constraint stops more than BOTANY_NUM_ROUNDS games being
+    # reported between a pair of bots when games are played concurrently.
+    round_ix = models.IntegerField()
 
     objects = managers.GameManager()
 
+    class Meta:
+        # The index for the unique constraint also serves queries for games
+        # between a given pair of bots.  The other indexes serve queries for
+        # games against a given bot, which are ordered by created_at and id.
+        unique_together = [("bot1", "bot2", "round_ix")]
+        indexes = [
+            models.Index(
+                fields=["bot1", "created_at", "id"], name="botany_game_bot1_created_idx"
+            ),
+            models.Index(
+                fields=["bot2", "created_at", "id"], name="botany_game_bot2_created_idx"
+            ),
+        ]
+
     def summary(self):
         if self.score == 1:
             return "bot1 won"
@@ -243,8 +292,12 @@ class Game(AbstractBotanyModel):
             return f"{losing_bot} exceeded the opcode limit"
         elif self.result_type == "invalid_state":
             return f"{losing_bot} returned an invalid state"
+        elif self.result_type == "time_limit":
+            return f"{losing_bot} exceeded the time limit"
+        elif self.result_type == "memory_limit":
+            return f"{losing_bot} exceeded the memory limit"
         else:
             assert False
 
     def move_list(self):
-        return [int(s) for s in self.moves]
+        return decode_moves(self.moves)
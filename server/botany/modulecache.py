@@ -0,0 +1,47 @@
+from botany_core import loader
+from django.conf import settings
+
+
+class BotModuleCache:
+    """Cache of bots' compiled code, for use in worker processes and in views
+    that play moves.
+
+    This is a thin layer over a botany_core.loader.CodeCache, whose entries are
+    keyed by a hash of the code, so entries never need to be invalidated when a
+    bot changes state.  Bots' states change in the web process, and the cache
+    lives in each worker process, so it couldn't be invalidated anyway.
+
+    Only the compiled code is cached, and a fresh module is created from it for
+    each game.  We can't cache modules themselves, since a bot could keep state
+    in its module's namespace between games.
+    """
+
+    def __init__(self, maxsize, cache_dir=None):
+        self.code_cache = loader.CodeCache(maxsize, cache_dir)
+
+    @property
+    def hits(self):
+        return self.code_cache.hits
+
+    @property
+    def misses(self):
+        return self.code_cache.misses
+
+    def create_module(self, name, bot):
+        """Return new module with given name, containing bot's code."""
+
+        return loader.create_module_from_str(name, bot.code, cache=self.code_cache)
+
+    def get_code_object(self, bot):
+        return self.code_cache.get_code_object(bot.code)
+
+    def clear(self):
+        self.code_cache.clear()
+
+    def __len__(self):
+        return len(self.code_cache)
+
+
+bot_module_cache = BotModuleCache(
+    settings.BOT_MODULE_CACHE_SIZE, settings.BOT_CODE_CACHE_DIR
+)
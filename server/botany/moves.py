@@ -0,0 +1,60 @@
+"""Compact encoding of a game's moves, for storing in Game.moves.
+
+Each move is encoded as an unsigned LEB128 varint: seven bits per byte, least
+significant first, with the top bit set on every byte except the last.  Moves
+less than 128 (which is all of them, for the games we have so far) take a
+single byte, so a game of noughts and crosses takes at most nine bytes, and a
+game of Connect Four at most 42.
+"""
+
+
+def encode_moves(move_list):
+    """Return bytes encoding given list of moves."""
+
+    if all(0 <= move < 0x80 for move in move_list):
+        return bytes(move_list)
+
+    data = bytearray()
+
+    for move in move_list:
+        if move < 0:
+            raise ValueError(f"Cannot encode negative move: {move}")
+
+        while move >= 0x80:
+            data.append((move & 0x7F) | 0x80)
+            move >>= 7
+        data.append(move)
+
+    return bytes(data)
+
+
+def decode_moves(data):
+    """Return list of moves encoded in given bytes.
+
+    data may also be a memoryview, which is what some database backends return
+    for a BinaryField.
+    """
+
+    data = bytes(data)
+
+    if data.isascii():
+        # Every move is a single byte, so let bytes do the work.
+        return list(data)
+
+    move_list = []
+    move = 0
+    shift = 0
+
+    for byte in data:
+        move |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            move_list.append(move)
+            move = 0
+            shift = 0
+
+    if shift:
+        raise ValueError("Truncated move encoding")
+
+    return move_list
@@ -0,0 +1,26 @@
+import atexit
+import pwd
+
+from botany_core.sandbox import SandboxPool
+from django.conf import settings
+
+if settings.SANDBOX_USER:
+    user = pwd.getpwnam(settings.SANDBOX_USER)
+    uid, gid = user.pw_uid, user.pw_gid
+else:
+    uid, gid = None, None
+
+# Subprocesses are started the first time they are needed, and are only reused
+# if the worker process is long-lived (see botany.worker).
+sandbox_pool = SandboxPool(
+    settings.BOTANY_GAME_MODULE,
+    max_idle_workers=settings.SANDBOX_MAX_IDLE_WORKERS,
+    max_games=settings.SANDBOX_MAX_GAMES,
+    max_memory_growth=settings.SANDBOX_MAX_MEMORY_GROWTH,
+    memory_limit=settings.SANDBOX_MEMORY_LIMIT,
+    move_timeout=settings.SANDBOX_MOVE_TIMEOUT,
+    uid=uid,
+    gid=gid,
+)
+
+atexit.register(sandbox_pool.close)
@@ -1,33 +1,98 @@
+import itertools
+
 import django_rq
 from django.conf import settings
+from rq.job import Job
 
 from . import actions
+from .models import Bot
 
 
 def schedule_games_against_house_bots(bot):
+    """Schedule games between bot, which is under probation, and the house bots.
+
+    A job is enqueued for each house bot, so that the games can be played in
+    parallel by several workers.  If the bot fails a game in one job, the other
+    jobs stop once they see this, and the last job to finish makes the bot
+    active if it has passed.
+    """
     queue = get_house_queue()
 
-    if settings.USE_QUEUES:
-        queue.enqueue(actions.play_games_against_house_bots, bot.id)
+    if not settings.USE_QUEUES:
+        return
+
+    house_bot_ids = list(Bot.objects.house_bots().values_list("id", flat=True))
+
+    if not house_bot_ids:
+        queue.enqueue(actions.activate_bot_if_probation_passed, bot.id)
+        return
+
+    with queue.connection.pipeline() as pipeline:
+        for house_bot_id in house_bot_ids:
+            job = Job.create(
+                actions.play_games_against_house_bot,
+                args=(bot.id, house_bot_id),
+                connection=queue.connection,
+            )
+            queue.enqueue_job(job, pipeline=pipeline)
+
+        pipeline.execute()
 
 
 def schedule_games(unplayed_games):
     """Schedule unplayed games.
 
-    unplayed_games is a dict mapping (bot1_id, bot2_id) to the number of games
-    that have not yet been played between bot1 and bot2.
+    unplayed_games is an iterable of ((bot1_id, bot2_id), num_games) pairs,
+    where num_games is the number of games that have not yet been played between
+    bot1 and bot2.
+
+    Rather than enqueueing a job for each game, the pairs are split into chunks
+    of settings.SCHEDULE_CHUNK_SIZE pairs, and a job is enqueued to play all the
+    unplayed games for each chunk.  Jobs are written to Redis in batches, with a
+    pipeline, to avoid a round-trip per job.
 
     settings.USE_QUEUES is usually False in tests, which speeds up tests
     (especially those using Hypothesis) significantly.
     """
     queue = get_main_queue()
+    chunk_size = settings.SCHEDULE_CHUNK_SIZE
 
-    for (bot1_id, bot2_id), num_games in unplayed_games.items():
-        assert 0 < num_games <= settings.BOTANY_NUM_ROUNDS
+    with queue.connection.pipeline() as pipeline:
+        for ix, chunk in enumerate(chunks(unplayed_games, chunk_size)):
+            for _, num_games in chunk:
+                assert 0 < num_games <= settings.BOTANY_NUM_ROUNDS
 
-        for ix in range(num_games):
             if settings.USE_QUEUES:
-                queue.enqueue(actions.play_game_and_report_result, bot1_id, bot2_id)
+                enqueue_games(queue, chunk, pipeline)
+
+                if (ix + 1) % PIPELINE_SIZE == 0:
+                    pipeline.execute()
+
+        pipeline.execute()
+
+
+# The maximum number of jobs that schedule_games() writes to Redis at once
+PIPELINE_SIZE = 1000
+
+
+def enqueue_games(queue, unplayed_games, pipeline):
+    job = Job.create(
+        actions.play_games_and_report_results,
+        args=(unplayed_games,),
+        connection=queue.connection,
+    )
+    queue.enqueue_job(job, pipeline=pipeline)
+
+
+def chunks(iterable, size):
+    """Yield lists of up to size items from iterable."""
+
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
 
 
 def get_house_queue():
@@ -23,6 +23,15 @@ BOTANY_GAME_PACKAGE = os.environ["BOTANY_GAME_PACKAGE"]
 BOTANY_NUM_ROUNDS = int(os.environ["BOTANY_NUM_ROUNDS"])
 BOTANY_OPCODE_LIMIT = int(os.environ["BOTANY_OPCODE_LIMIT"])
 
+# Per-move limits on wall-clock time (in seconds) and peak memory allocated (in
+# bytes).  Set to 0 to disable.  The memory limit uses tracemalloc, which makes
+# games about twice as slow, so it is off by default, and the sandbox's limit on
+# each worker's address space (SANDBOX_MEMORY_LIMIT_MB) is relied on instead.
+BOTANY_MOVE_TIME_LIMIT = float(os.getenv("BOTANY_MOVE_TIME_LIMIT", 1)) or None
+BOTANY_MOVE_MEMORY_LIMIT = (
+    int(os.getenv("BOTANY_MOVE_MEMORY_LIMIT_MB", 0)) << 20 or None
+)
+
 # Tournament time constraints in ISO8601 format.
 # If not given, +/- 1 day is a default.
 BOTANY_TOURNAMENT_START_AT = os.environ.get("BOTANY_TOURNAMENT_START_AT")
@@ -45,6 +54,12 @@ else:
             tzinfo=timezone.utc
         )
 
+# Where the ZIP file of bots' code is cached once the tournament has closed.  If
+# this is empty, the ZIP file is generated for each download.  This must not be
+# writable by anything other than the server.
+BOTS_ZIP_CACHE_DIR = os.getenv("BOTS_ZIP_CACHE_DIR")
+
+
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -135,6 +150,55 @@ QUEUE_CONFIG = {"URL": os.environ["REDIS_URL"]}
 
 RQ_QUEUES = {"house": QUEUE_CONFIG, "main": QUEUE_CONFIG}
 
+# The number of pairs of bots whose unplayed games are played by each job
+SCHEDULE_CHUNK_SIZE = int(os.getenv("SCHEDULE_CHUNK_SIZE", 1))
+
+# The number of bots whose compiled code is cached in memory by each process
+BOT_MODULE_CACHE_SIZE = int(os.getenv("BOT_MODULE_CACHE_SIZE", 100))
+
+# Where bots' compiled code is cached on disk, so that it can be shared between
+# processes.  If this is empty, compiled code is only cached in memory.  This
+# must not be writable by anything other than the server.
+BOT_CODE_CACHE_DIR = os.getenv("BOT_CODE_CACHE_DIR")
+
+# Whether worker processes play games in a pool of sandboxed subprocesses.  See
+# botany_core.sandbox.
+USE_SANDBOX = not bool(os.getenv("DONT_USE_SANDBOX"))
+
+# Sandboxed subprocesses are replaced after playing this many games, or if their
+# peak memory use grows by more than SANDBOX_MAX_MEMORY_GROWTH bytes
+SANDBOX_MAX_GAMES = int(os.getenv("SANDBOX_MAX_GAMES", 1000))
+SANDBOX_MAX_MEMORY_GROWTH = int(os.getenv("SANDBOX_MAX_MEMORY_GROWTH_MB", 100)) << 20
+
+# The number of idle sandboxed subprocesses each worker process keeps.  Each bot
+# in a match gets its own subprocess, which is only reused for the same code.
+SANDBOX_MAX_IDLE_WORKERS = int(os.getenv("SANDBOX_MAX_IDLE_WORKERS", 4))
+
+# The user that sandboxed subprocesses run as.  If this is empty, they run as the
+# same user as the worker process, but without any capabilities.
+SANDBOX_USER = os.getenv("SANDBOX_USER")
+
+# The maximum address space of each sandboxed subprocess, in bytes
+SANDBOX_MEMORY_LIMIT = int(os.getenv("SANDBOX_MEMORY_LIMIT_MB", 512)) << 20
+
+# Sandboxed subprocesses that take more than this many seconds over a move are
+# killed, and the bot that was moving loses
+SANDBOX_MOVE_TIMEOUT = float(os.getenv("SANDBOX_MOVE_TIMEOUT", 10))
+
+
+# Caches
+# https://docs.djangoproject.com/en/2.1/topics/cache/
+
+# Used for rendered game replays.  When the cache is full, the least recently
+# used entries are evicted.  A rendered Connect Four replay takes up to about
+# 80KB, and each web process has its own cache, so keep this small.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "OPTIONS": {"MAX_ENTRIES": int(os.getenv("CACHE_MAX_ENTRIES", 100))},
+    }
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.1/ref/settings/#auth-password-validators
@@ -0,0 +1,15 @@
+from botany_noughtsandcrosses import game
+
+# Neither player makes more than five moves in a game, so this is only more
+# than five if the module has been reused for another game
+num_moves = 0
+
+
+def get_next_move(board):
+    global num_moves
+    num_moves += 1
+
+    if num_moves > 5:
+        return "module was reused"
+
+    return game.available_moves(board)[0]
@@ -28,7 +28,7 @@ def create_house_bot(name=None, code=None):
     global bot_ix
     bot_ix += 1
 
-    name = name or f"bot-{bot_ix}"
+    name = name or f"bot-{bot_ix:04}"
     code = code or bot_code("randobot")
 
     return actions.create_house_bot(name, code)
@@ -39,7 +39,7 @@ def create_bot(user=None, name=None, code=None, state="active"):
     bot_ix += 1
 
     user = user or create_user()
-    name = name or f"bot-{bot_ix}"
+    name = name or f"bot-{bot_ix:04}"
     code = code or bot_code("randobot")
 
     bot = actions.create_bot(user, name, code)
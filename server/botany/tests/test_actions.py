@@ -1,4 +1,8 @@
+from array import array
+from unittest.mock import patch
+
 from botany_core.runner import Result, ResultType
+from django.db import IntegrityError
 from django.test import TestCase, override_settings
 
 from botany import actions, models, scheduler
@@ -55,6 +59,8 @@ class CreateBotTests(TestCase):
         self.assertEqual(bot.code, code)
         self.assertTrue(bot.is_under_probation)
         self.assertEqual(user.active_bot, bot)
+        self.assertTrue(bot.is_goldfish)
+        self.assertGreater(bot.code_size, 0)
 
         bot = actions.create_bot(user, "randobot", code)
 
@@ -103,6 +109,8 @@ class MarkBotAsFailedTests(TestCase):
 @override_settings(USE_QUEUES=True)
 class ScheduleGamesAgainstHouseBotsTests(TestCase):
     def test_schedule_games_against_house_bots(self):
+        factories.create_house_bot()
+        factories.create_house_bot()
         bot = factories.create_bot(state="probation")
 
         scheduler.clear_queues()
@@ -110,7 +118,7 @@ class ScheduleGamesAgainstHouseBotsTests(TestCase):
         actions.schedule_games_against_house_bots(bot)
 
         queue = scheduler.get_house_queue()
-        self.assertEqual(len(queue.jobs), 1)
+        self.assertEqual(len(queue.jobs), 2)
 
 
 @override_settings(USE_QUEUES=True)
@@ -126,7 +134,7 @@ class ScheduleUnplayedGamesForBotTests(TestCase):
         actions.schedule_unplayed_games_for_bot(bot1)
 
         queue = scheduler.get_main_queue()
-        self.assertEqual(len(queue.jobs), 7)
+        self.assertEqual(len(queue.jobs), 2)
 
 
 @override_settings(USE_QUEUES=True)
@@ -145,7 +153,31 @@ class ScheduleAllUnplayedGamesTests(TestCase):
         actions.schedule_all_unplayed_games()
 
         queue = scheduler.get_main_queue()
-        self.assertEqual(len(queue.jobs), 24)
+        self.assertEqual(len(queue.jobs), 6)
+
+    @override_settings(SCHEDULE_CHUNK_SIZE=4)
+    def test_schedule_all_unplayed_games_in_chunks(self):
+        [factories.create_bot() for _ in range(3)]
+
+        scheduler.clear_queues()
+
+        actions.schedule_all_unplayed_games()
+
+        queue = scheduler.get_main_queue()
+        self.assertEqual(len(queue.jobs), 2)
+
+
+class PlayGamesAndReportResultsTests(TestCase):
+    def test_play_games_and_report_results(self):
+        bot1, bot2 = [factories.create_bot() for _ in range(2)]
+        factories.report_result(bot1.id, bot2.id, 1)
+
+        actions.play_games_and_report_results(
+            [((bot1.id, bot2.id), 4), ((bot2.id, bot1.id), 2)]
+        )
+
+        self.assertEqual(models.Game.objects.filter(bot1=bot1, bot2=bot2).count(), 5)
+        self.assertEqual(models.Game.objects.filter(bot1=bot2, bot2=bot1).count(), 2)
 
 
 class PlayGamesBetweenHouseBotTests(TestCase):
@@ -187,6 +219,55 @@ class PlayGamesAgainstHouseBotsTests(TestCase):
         self.assertEqual(models.Game.objects.count(), 2)
         self.assertTrue(bot.is_failed)
 
+    def test_play_games_against_each_house_bot(self):
+        house_bot1, house_bot2 = models.Bot.objects.house_bots()
+        bot = factories.create_bot(state="probation")
+
+        actions.play_games_against_house_bot(bot.id, house_bot1.id)
+
+        bot.refresh_from_db()
+
+        self.assertEqual(models.Game.objects.count(), 10)
+        self.assertTrue(bot.is_under_probation)
+
+        actions.play_games_against_house_bot(bot.id, house_bot2.id)
+
+        bot.refresh_from_db()
+
+        self.assertEqual(models.Game.objects.count(), 20)
+        self.assertTrue(bot.is_active)
+
+    def test_play_games_against_house_bot_twice(self):
+        house_bot1, house_bot2 = models.Bot.objects.house_bots()
+        bot = factories.create_bot(state="probation")
+
+        actions.play_games_against_house_bot(bot.id, house_bot1.id)
+        actions.play_games_against_house_bot(bot.id, house_bot1.id)
+
+        # The job stops after its last game, before activating the bot, and is
+        # retried
+        with patch.object(actions, "activate_bot_if_probation_passed"):
+            actions.play_games_against_house_bot(bot.id, house_bot2.id)
+        actions.play_games_against_house_bot(bot.id, house_bot2.id)
+
+        bot.refresh_from_db()
+
+        self.assertEqual(models.Game.objects.count(), 20)
+        self.assertTrue(bot.is_active)
+
+    def test_play_games_against_house_bot_after_failing(self):
+        house_bot1, house_bot2 = models.Bot.objects.house_bots()
+        code = factories.bot_code("invalid_when_playing_second")
+        bot = factories.create_bot(code=code, state="probation")
+
+        actions.play_games_against_house_bot(bot.id, house_bot1.id)
+        actions.play_games_against_house_bot(bot.id, house_bot2.id)
+
+        bot.refresh_from_db()
+
+        self.assertEqual(models.Game.objects.count(), 2)
+        self.assertTrue(bot.is_failed)
+
 
 class PlayGameAndReportResultTests(TestCase):
     def test_play_game_and_report_results(self):
@@ -194,7 +275,11 @@ class PlayGameAndReportResultTests(TestCase):
 
         actions.play_game_and_report_result(bot1.id, bot2.id)
 
-        models.Game.objects.get(bot1_id=bot1.id, bot2_id=bot2.id)
+        game = models.Game.objects.get(bot1_id=bot1.id, bot2_id=bot2.id)
+
+        num_moves = len(game.move_list())
+        self.assertEqual(bot1.move_stats.num_moves, (num_moves + 1) // 2)
+        self.assertEqual(bot2.move_stats.num_moves, num_moves // 2)
 
 
 class PlayGameTests(TestCase):
@@ -205,15 +290,68 @@ class PlayGameTests(TestCase):
 
         self.assertEqual(result.result_type, ResultType.COMPLETE)
 
+    def test_play_game_and_report_result_when_all_games_played(self):
+        bot1, bot2 = [factories.create_bot() for _ in range(2)]
+
+        for _ in range(5):
+            factories.report_result(bot1.id, bot2.id, 0)
+
+        actions.play_game_and_report_result(bot1.id, bot2.id)
+
+        self.assertEqual(models.Game.objects.count(), 5)
+
     def test_play_game_when_all_games_played(self):
         bot1, bot2 = [factories.create_bot() for _ in range(2)]
 
         for _ in range(5):
             factories.report_result(bot1.id, bot2.id, 0)
 
-        result = actions.play_game(bot1.id, bot2.id)
+        with patch.object(actions, "run_games") as run_games:
+            result = actions.play_game(bot1.id, bot2.id)
 
         self.assertIsNone(result)
+        run_games.assert_not_called()
+
+
+class PlayGamesTests(TestCase):
+    def test_play_games(self):
+        bot1, bot2 = [factories.create_bot() for _ in range(2)]
+
+        results = actions.play_games(bot1.id, bot2.id, 3)
+
+        self.assertEqual(len(results), 3)
+        for result in results:
+            self.assertEqual(result.result_type, ResultType.COMPLETE)
+
+    def test_play_games_uses_fresh_modules(self):
+        code = factories.bot_code("reused_module_detector")
+        bot1, bot2 = [factories.create_bot(code=code) for _ in range(2)]
+
+        results = actions.play_games(bot1.id, bot2.id, 3)
+
+        for result in results:
+            self.assertEqual(result.result_type, ResultType.COMPLETE)
+
+    def test_play_games_when_some_games_played(self):
+        bot1, bot2 = [factories.create_bot() for _ in range(2)]
+
+        for _ in range(3):
+            factories.report_result(bot1.id, bot2.id, 0)
+
+        results = actions.play_games(bot1.id, bot2.id, 5)
+
+        self.assertEqual(len(results), 2)
+
+    @override_settings(USE_SANDBOX=True)
+    def test_play_games_in_sandbox(self):
+        bot1, bot2 = [factories.create_bot() for _ in range(2)]
+
+        results = actions.play_games(bot1.id, bot2.id, 3)
+
+        self.assertEqual(len(results), 3)
+        for result in results:
+            self.assertEqual(result.result_type, ResultType.COMPLETE)
+            self.assertEqual(len(result.move_times), len(result.move_list))
 
 
 class ReportResultTest(TestCase):
@@ -241,7 +379,7 @@ class ReportResultTest(TestCase):
         self.assertEqual(game.bot1_id, bot1.id)
         self.assertEqual(game.bot2_id, bot2.id)
         self.assertEqual(game.score, 1)
-        self.assertEqual(game.moves, "01478")
+        self.assertEqual(game.move_list(), [0, 1, 4, 7, 8])
         self.assertEqual(game.result_type, "complete")
 
         actions.report_result(bot1.id, bot2.id, self.build_result(-1))
@@ -254,6 +392,18 @@ class ReportResultTest(TestCase):
         self.assertEqual(bot1.score, -1)
         self.assertEqual(bot2.score, 1)
 
+    def test_report_result_locks_bots_before_creating_game(self):
+        bot1, bot2 = [factories.create_bot() for _ in range(2)]
+
+        def lock_bots(bot_ids):
+            self.assertEqual(models.Game.objects.count(), 0)
+
+        with patch.object(actions, "lock_bots", side_effect=lock_bots) as mock:
+            actions.report_result(bot1.id, bot2.id, self.build_result(1))
+
+        mock.assert_called_once_with([bot1.id, bot2.id])
+        self.assertEqual(models.Game.objects.count(), 1)
+
     def test_report_result_for_incomplete_game(self):
         bot1, bot2 = [factories.create_bot() for _ in range(2)]
 
@@ -265,7 +415,7 @@ class ReportResultTest(TestCase):
         self.assertEqual(game.bot1_id, bot1.id)
         self.assertEqual(game.bot2_id, bot2.id)
         self.assertEqual(game.score, 1)
-        self.assertEqual(game.moves, "01478")
+        self.assertEqual(game.move_list(), [0, 1, 4, 7, 8])
         self.assertEqual(game.result_type, "exception")
         self.assertEqual(game.traceback, "KeyError ...")
 
@@ -278,3 +428,98 @@ class ReportResultTest(TestCase):
         actions.report_result(bot1.id, bot2.id, self.build_result(1))
 
         self.assertEqual(models.Game.objects.count(), 5)
+
+    def test_report_result_numbers_rounds(self):
+        bot1, bot2 = [factories.create_bot() for _ in range(2)]
+
+        for _ in range(3):
+            actions.report_result(bot1.id, bot2.id, self.build_result(1))
+        actions.report_result(bot2.id, bot1.id, self.build_result(1))
+
+        self.assertEqual(
+            list(bot1.bot1_games.order_by("id").values_list("round_ix", flat=True)),
+            [0, 1, 2],
+        )
+        self.assertEqual(list(bot1.bot2_games.values_list("round_ix", flat=True)), [0])
+
+    def test_report_result_when_round_reported_concurrently(self):
+        bot1, bot2 = [factories.create_bot() for _ in range(2)]
+        actions.report_result(bot1.id, bot2.id, self.build_result(1))
+
+        # Simulate another worker having reported round 0 after this worker
+        # looked for the next round_ix
+        with patch.object(models.Game.objects, "next_round_ix", side_effect=[0, 1]):
+            actions.report_result(bot1.id, bot2.id, self.build_result(-1))
+
+        self.assertEqual(
+            list(bot1.bot1_games.order_by("id").values_list("round_ix", "score")),
+            [(0, 1), (1, -1)],
+        )
+
+    def test_report_result_gives_up_after_repeated_conflicts(self):
+        bot1, bot2 = [factories.create_bot() for _ in range(2)]
+        actions.report_result(bot1.id, bot2.id, self.build_result(1))
+
+        with patch.object(models.Game.objects, "next_round_ix", return_value=0):
+            with self.assertRaises(IntegrityError):
+                actions.report_result(bot1.id, bot2.id, self.build_result(-1))
+
+        self.assertEqual(models.Game.objects.count(), 1)
+
+    def test_report_result_does_not_retry_other_integrity_errors(self):
+        bot1, bot2 = [factories.create_bot() for _ in range(2)]
+
+        with patch.object(
+            actions, "record_result_in_standings", side_effect=IntegrityError
+        ) as record_result_in_standings:
+            with self.assertRaises(IntegrityError):
+                actions.report_result(bot1.id, bot2.id, self.build_result(1))
+
+        self.assertEqual(record_result_in_standings.call_count, 1)
+        self.assertEqual(models.Game.objects.count(), 0)
+
+    def test_report_result_records_move_stats(self):
+        bot1, bot2 = [factories.create_bot() for _ in range(2)]
+
+        result = self.build_result(1)
+        result.opcode_counts = array("l", [10, 20, 30, 40, 50])
+        result.move_times = array("d", [0.5, 0.25, 0.125, 1.0, 0.5])
+        actions.report_result(bot1.id, bot2.id, result)
+
+        result.opcode_counts = array("l", [5, 60])
+        result.move_times = array("d", [0.25, 0.5])
+        actions.report_result(bot2.id, bot1.id, result)
+
+        stats1 = models.MoveStats.objects.get(bot=bot1)
+        self.assertEqual(stats1.num_moves, 4)
+        self.assertEqual(stats1.total_opcodes, 150)
+        self.assertEqual(stats1.max_opcodes, 60)
+        self.assertEqual(stats1.total_move_time, 1.625)
+        self.assertEqual(stats1.max_move_time, 0.5)
+
+        stats2 = models.MoveStats.objects.get(bot=bot2)
+        self.assertEqual(stats2.num_moves, 3)
+        self.assertEqual(stats2.total_opcodes, 65)
+        self.assertEqual(stats2.max_opcodes, 40)
+        self.assertEqual(stats2.total_move_time, 1.5)
+        self.assertEqual(stats2.max_move_time, 1.0)
+
+    def test_report_result_when_first_move_was_not_counted(self):
+        bot1, bot2 = [factories.create_bot() for _ in range(2)]
+
+        result = self.build_result(-1, ResultType.MEMORY_LIMIT)
+        result.opcode_counts = array("l")
+        result.move_times = array("d", [0.5])
+        actions.report_result(bot1.id, bot2.id, result)
+
+        stats = models.MoveStats.objects.get(bot=bot1)
+        self.assertEqual(stats.num_moves, 1)
+        self.assertEqual(stats.max_opcodes, 0)
+        self.assertFalse(models.MoveStats.objects.filter(bot=bot2).exists())
+
+    def test_report_result_without_move_stats(self):
+        bot1, bot2 = [factories.create_bot() for _ in range(2)]
+
+        actions.report_result(bot1.id, bot2.id, self.build_result(1))
+
+        self.assertFalse(models.MoveStats.objects.exists())
@@ -1,9 +1,13 @@
+import contextlib
+import io
 import os
 
 from django.core.management import call_command
-from django.test import TestCase
+from django.test import TestCase, override_settings
 
-from botany.models import User
+from botany.models import MoveStats, User
+
+from . import factories
 
 
 class CreatesuperuserTests(TestCase):
@@ -24,3 +28,28 @@ class CreatesuperuserTests(TestCase):
         self.assertTrue(user.is_active)
         self.assertTrue(user.is_admin)
         self.assertTrue(user.is_superuser)
+
+
+@override_settings(BOTANY_OPCODE_LIMIT=1000)
+class MovestatsTests(TestCase):
+    def test_movestats(self):
+        bot1, bot2, bot3 = [factories.create_bot() for _ in range(3)]
+
+        MoveStats.objects.record(bot1.id, [100, 950], [0.5, 6.5])
+        MoveStats.objects.record(bot2.id, [100, 200], [0.5, 1.5])
+        MoveStats.objects.record(bot3.id, [100], [1.0])
+
+        stdout = io.StringIO()
+        stderr = io.StringIO()
+
+        with contextlib.redirect_stdout(stdout):
+            call_command("movestats", stderr=stderr)
+
+        lines = stdout.getvalue().splitlines()
+        self.assertIn(f"{bot1.name} :: 7.00s (70.0%)", lines[1])
+        self.assertIn(f"{bot1.name} :: 950 (95.0% of limit)", lines[6])
+
+        warnings = stderr.getvalue().splitlines()
+        self.assertEqual(len(warnings), 2)
+        self.assertIn(f"{bot1.name} took 70.0%", warnings[0])
+        self.assertIn(f"{bot1.name} used 950 opcodes", warnings[1])
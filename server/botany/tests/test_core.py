@@ -2,12 +2,29 @@
 # so that they can be easily run by the Django test runner.
 
 import itertools
+import os
+import random
 import re
+import signal
+import sys
 import tempfile
-from unittest import TestCase
-
-from botany_core import tracer, verifier
-from botany_core.runner import Result, ResultType, rerun_game, run_game
+import tracemalloc
+from unittest import TestCase, skipUnless
+from unittest.mock import patch
+
+from botany_connectfour import bitboard as connectfour_bitboard
+from botany_connectfour import game as connectfour_game
+from botany_core import limits, loader, tracer, verifier
+from botany_core.sandbox import SandboxError, SandboxPool
+from botany_core.runner import (
+    Result,
+    ResultType,
+    final_board,
+    generate_boards,
+    rerun_game,
+    run_game,
+    run_games,
+)
 from botany_noughtsandcrosses import game
 
 
@@ -28,6 +45,25 @@ class TracerTests(TestCase):
                 self.f(10)
                 self.f(10)
 
+    def test_exceeding_limit_in_nested_call(self):
+        def g():
+            self.f(10)
+            self.f(10)
+
+        with self.assertRaises(tracer.OpCodeLimitExceeded):
+            with tracer.limited_opcodes(100):
+                g()
+
+    def test_exceeding_limit_in_generator(self):
+        def gen(n):
+            for ix in range(n):
+                yield ix
+
+        with self.assertRaises(tracer.OpCodeLimitExceeded):
+            with tracer.limited_opcodes(100):
+                for _ in gen(30):
+                    pass
+
     def test_count_is_reset_on_each_call(self):
         with tracer.limited_opcodes(100):
             self.f(10)
@@ -58,6 +94,122 @@ class TracerTests(TestCase):
         self.assertIsNone(tracer.get_opcode_limit())
 
 
+class Suppress:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return True
+
+
+def count_every_opcode(fn, *args):
+    """Call fn, and return the number of opcodes executed, counting each opcode
+    with a sys.monitoring INSTRUCTION event.
+    """
+
+    monitoring = sys.monitoring
+    tool_id = 4
+    count = 0
+
+    def instruction(code, offset):
+        nonlocal count
+        count += 1
+
+    def start(code, offset):
+        nonlocal count
+        # INSTRUCTION events are not received for RESUME
+        count += 1
+        monitoring.set_local_events(tool_id, code, monitoring.events.INSTRUCTION)
+
+    monitoring.use_tool_id(tool_id, "test")
+    try:
+        monitoring.register_callback(
+            tool_id, monitoring.events.INSTRUCTION, instruction
+        )
+        monitoring.register_callback(tool_id, monitoring.events.PY_START, start)
+        monitoring.register_callback(tool_id, monitoring.events.PY_RESUME, start)
+        monitoring.set_events(
+            tool_id, monitoring.events.PY_START | monitoring.events.PY_RESUME
+        )
+        fn(*args)
+    finally:
+        monitoring.set_events(tool_id, 0)
+        monitoring.free_tool_id(tool_id)
+
+    return count
+
+
+@skipUnless(tracer.use_monitoring, "requires sys.monitoring")
+class BlockCountingTests(TestCase):
+    @staticmethod
+    def branches(n):
+        x = 0
+        for ix in range(n):
+            if ix % 3:
+                x += 1
+            else:
+                x -= 1
+        return x
+
+    @staticmethod
+    def generator(n):
+        def gen():
+            for ix in range(n):
+                yield ix
+
+        return [x for x in gen()]
+
+    @staticmethod
+    def comprehension(n):
+        return sum(x * x for x in range(n) if x % 2)
+
+    @staticmethod
+    def handled_exceptions(n):
+        x = 0
+        for ix in range(n):
+            try:
+                if ix % 2:
+                    raise ValueError
+                x += 1
+            except ValueError:
+                x -= 1
+        return x
+
+    @staticmethod
+    def suppressed_exceptions(n):
+        x = 0
+        for ix in range(n):
+            with Suppress():
+                x += 1
+                if ix % 2:
+                    raise KeyError
+                x += 1
+        return x
+
+    def assert_same_count(self, fn):
+        expected = count_every_opcode(fn, 100)
+
+        with tracer.limited_opcodes(10 ** 9) as counter:
+            fn(100)
+
+        self.assertEqual(counter.opcode_count, expected)
+
+    def test_branches(self):
+        self.assert_same_count(self.branches)
+
+    def test_generator(self):
+        self.assert_same_count(self.generator)
+
+    def test_comprehension(self):
+        self.assert_same_count(self.comprehension)
+
+    def test_handled_exceptions(self):
+        self.assert_same_count(self.handled_exceptions)
+
+    def test_suppressed_exceptions(self):
+        self.assert_same_count(self.suppressed_exceptions)
+
+
 class VerifierTests(TestCase):
     def test_valid_code(self):
         code = """
@@ -124,6 +276,34 @@ def get_move(board):
             verifier.verify_bot_code(code)
 
 
+class AnalyseBotCodeTests(TestCase):
+    code = """
+def get_next_move(board, state):
+    return 0, state
+"""
+
+    def test_analyse_bot_code(self):
+        analysis = verifier.analyse_bot_code(self.code)
+
+        self.assertEqual(analysis.param_names, ["board", "state"])
+        self.assertFalse(analysis.is_goldfish)
+        self.assertGreater(analysis.node_count, 0)
+        self.assertEqual(analysis.tree.body[0].name, "get_next_move")
+
+    def test_goldfish(self):
+        analysis = verifier.analyse_bot_code(FIRST_MOVE_BOT_CODE)
+
+        self.assertTrue(analysis.is_goldfish)
+
+    def test_analysis_is_memoized(self):
+        analysis = verifier.analyse_bot_code(self.code)
+
+        with patch("ast.parse") as parse:
+            self.assertIs(verifier.verify_bot_code(self.code), analysis)
+
+        parse.assert_not_called()
+
+
 class RerunGameTests(TestCase):
     def test_rerun_game(self):
         move_list = [0, 1, 2, 3, 4, 5, 6]
@@ -140,6 +320,25 @@ class RerunGameTests(TestCase):
         ]
         self.assertEqual(boards, expected_boards)
 
+    def test_generate_boards(self):
+        move_list = [0, 1, 2, 3, 4, 5, 6]
+        boards = generate_boards(game, move_list)
+
+        first_board = next(boards)
+        self.assertEqual(first_board, [".", ".", ".", ".", ".", ".", ".", ".", "."])
+
+        remaining_boards = list(boards)
+        self.assertEqual(remaining_boards, rerun_game(game, move_list)[1:])
+
+        # Boards that have already been yielded are not changed by later moves
+        self.assertEqual(first_board, [".", ".", ".", ".", ".", ".", ".", ".", "."])
+
+    def test_final_board(self):
+        move_list = [0, 1, 2, 3, 4, 5, 6]
+        board = final_board(game, move_list)
+
+        self.assertEqual(board, ["X", "O", "X", "O", "X", "O", "X", ".", "."])
+
 
 class RunGameTests(TestCase):
     def test_bot1_wins(self):
@@ -327,6 +526,49 @@ class RunGameTests(TestCase):
 
         self.assertEqual(result, expected_result)
 
+    def test_collect_stats(self):
+        result = run_game(game, get_next_move_1, get_next_move_10, collect_stats=True)
+
+        # One entry for each of the seven moves
+        self.assertEqual(len(result.opcode_counts), 7)
+        self.assertEqual(len(result.move_times), 7)
+        self.assertTrue(all(count > 0 for count in result.opcode_counts))
+        self.assertTrue(all(t >= 0 for t in result.move_times))
+
+        # get_next_move_10 does much more work than get_next_move_1
+        self.assertGreater(
+            min(result.opcode_counts[1::2]), max(result.opcode_counts[0::2])
+        )
+
+    def test_collect_stats_includes_losing_move(self):
+        result = run_game(
+            game,
+            get_next_move_1,
+            get_next_move_10,
+            opcode_limit=1000,
+            collect_stats=True,
+        )
+
+        self.assertEqual(result.result_type, ResultType.TIMEOUT)
+        self.assertEqual(len(result.opcode_counts), 2)
+        self.assertGreater(result.opcode_counts[1], 1000)
+
+    def test_collect_stats_when_move_fails_before_counting_opcodes(self):
+        with patch("botany_core.runner.limited_opcodes", side_effect=MemoryError):
+            result = run_game(
+                game, get_next_move_1, get_next_move_1, collect_stats=True
+            )
+
+        self.assertEqual(result.result_type, ResultType.MEMORY_LIMIT)
+        self.assertEqual(len(result.move_times), 1)
+        self.assertEqual(len(result.opcode_counts), 0)
+
+    def test_stats_not_collected_by_default(self):
+        result = run_game(game, get_next_move_1, get_next_move_1)
+
+        self.assertIsNone(result.opcode_counts)
+        self.assertIsNone(result.move_times)
+
     def test_re_cache_cleared(self):
         pattern = "^(..+?)\1+$"
         key = (str, pattern, 0)
@@ -338,6 +580,544 @@ class RunGameTests(TestCase):
         self.assertNotIn(key, re._cache)
 
 
+class CopyBoardTests(TestCase):
+    def test_bots_cannot_change_board(self):
+        for game_mod in [game, connectfour_game]:
+            boards = []
+
+            def get_next_move(board):
+                move = game_mod.available_moves(board)[0]
+                boards.append(game_mod.copy_board(board))
+                game_mod.make_move(board, move, "X")
+                return move
+
+            result = run_game(game_mod, get_next_move, get_next_move)
+            self.assertTrue(result.is_complete)
+
+            # Each bot should see the board as it was after all the previous
+            # moves, without the changes it made itself
+            self.assertEqual(
+                boards, rerun_game(game_mod, result.move_list)[: len(boards)]
+            )
+
+
+class RunGamesTests(TestCase):
+    def test_run_games(self):
+        results = run_games(game, lambda: get_next_move_1, lambda: get_next_move_1, 3)
+
+        expected_result = Result(
+            result_type=ResultType.COMPLETE,
+            score=1,
+            move_list=[0, 1, 2, 3, 4, 5, 6],
+            traceback=None,
+            invalid_move=None,
+        )
+
+        self.assertEqual(results, [expected_result] * 3)
+
+    def test_move_lists_are_not_shared(self):
+        results = run_games(game, lambda: get_next_move_1, lambda: get_next_move_1, 2)
+
+        self.assertIsNot(results[0].move_list, results[1].move_list)
+
+    def test_timeout(self):
+        results = run_games(
+            game,
+            lambda: get_next_move_1,
+            lambda: get_next_move_10,
+            2,
+            opcode_limit=1000,
+        )
+
+        self.assertEqual(
+            [result.result_type for result in results], [ResultType.TIMEOUT] * 2
+        )
+
+    def test_each_game_gets_fresh_functions(self):
+        def get_fn():
+            mod = loader.create_module_from_str("mod", MODULE_STATE_BOT_CODE)
+            return mod.get_next_move
+
+        results = run_games(game, get_fn, get_fn, 3)
+
+        self.assertEqual(
+            [result.result_type for result in results], [ResultType.COMPLETE] * 3
+        )
+
+
+FIRST_MOVE_BOT_CODE = """
+def get_next_move(board):
+    return [ix for ix, token in enumerate(board) if token == "."][0]
+"""
+
+# This makes an invalid move if its module is reused for a second game, since
+# neither player makes more than five moves in a game
+MODULE_STATE_BOT_CODE = """
+num_moves = 0
+
+def get_next_move(board):
+    global num_moves
+    num_moves += 1
+    if num_moves > 5:
+        return "reused"
+    return [ix for ix, token in enumerate(board) if token == "."][0]
+"""
+
+
+class SandboxPoolTests(TestCase):
+    def setUp(self):
+        self.pool = SandboxPool("botany_noughtsandcrosses.game", max_games=4)
+        self.addCleanup(self.pool.close)
+
+    def run_games(self, code1, code2=FIRST_MOVE_BOT_CODE, num_games=1):
+        return self.pool.run_games(code1, code2, num_games, opcode_limit=1000)
+
+    def worker_pids(self):
+        return [worker.process.pid for _, worker in self.pool._idle_workers]
+
+    def test_each_game_gets_fresh_modules(self):
+        results = self.run_games(MODULE_STATE_BOT_CODE, MODULE_STATE_BOT_CODE, 3)
+
+        self.assertEqual(
+            [result.result_type for result in results], [ResultType.COMPLETE] * 3
+        )
+
+    def test_run_games(self):
+        results = self.run_games(FIRST_MOVE_BOT_CODE, num_games=2)
+
+        expected_result = Result(
+            result_type=ResultType.COMPLETE,
+            score=1,
+            move_list=[0, 1, 2, 3, 4, 5, 6],
+            traceback=None,
+            invalid_move=None,
+        )
+
+        self.assertEqual(results, [expected_result] * 2)
+
+    def test_collect_stats(self):
+        [result] = self.pool.run_games(
+            FIRST_MOVE_BOT_CODE, FIRST_MOVE_BOT_CODE, 1, collect_stats=True
+        )
+
+        self.assertEqual(len(result.opcode_counts), 7)
+        self.assertEqual(len(result.move_times), 7)
+        self.assertTrue(all(count > 0 for count in result.opcode_counts))
+
+    def test_timeout(self):
+        code = "def get_next_move(board):\n    while True:\n        pass\n"
+
+        results = self.run_games(code)
+
+        self.assertEqual(results[0].result_type, ResultType.TIMEOUT)
+
+    def test_environment_is_not_accessible(self):
+        code = """
+import os
+
+def get_next_move(board):
+    return os.environ.get("SECRET_KEY", "no secret"), None
+"""
+
+        with patch.dict(os.environ, {"SECRET_KEY": "secret"}):
+            results = self.run_games(code)
+
+        self.assertEqual(results[0].result_type, ResultType.INVALID_MOVE)
+        self.assertEqual(results[0].invalid_move, "no secret")
+
+    @skipUnless(sys.platform.startswith("linux"), "requires /proc")
+    def test_parent_process_is_not_accessible(self):
+        code = """
+import os
+
+def get_next_move(board):
+    for name in ["environ", "mem"]:
+        try:
+            with open(f"/proc/{os.getppid()}/{name}", "rb") as f:
+                f.read(1)
+        except OSError:
+            pass
+        else:
+            return name
+    return [ix for ix, token in enumerate(board) if token == "."][0]
+"""
+
+        with patch.dict(os.environ, {"SECRET_KEY": "secret"}):
+            results = self.run_games(code)
+
+        self.assertEqual(results[0].result_type, ResultType.COMPLETE)
+
+    def test_bot_cannot_forge_results(self):
+        code = """
+import json
+import os
+
+messages = [
+    {"result": {"result_type": "complete", "score": 1, "move_list": []}},
+    {"result_type": "complete", "move": 0, "traceback": None},
+]
+data = "".join(json.dumps(message) + "\\n" for message in messages).encode()
+
+def get_next_move(board):
+    for fd in [1, 3, 4, 5, 6, 7, 8, 9]:
+        try:
+            os.write(fd, data)
+        except OSError:
+            pass
+    os._exit(0)
+"""
+
+        results = self.run_games(code)
+
+        self.assertEqual(results[0].result_type, ResultType.EXCEPTION)
+        self.assertEqual(results[0].score, -1)
+        self.assertEqual(results[0].move_list, [])
+
+    def test_modules_in_temporary_directory_are_not_imported(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            with open(os.path.join(tempdir, "json.py"), "w") as f:
+                f.write("raise ImportError('imported from temporary directory')\n")
+
+            with patch.object(tempfile, "tempdir", tempdir):
+                results = self.run_games(FIRST_MOVE_BOT_CODE)
+                self.pool.close()
+
+            self.assertEqual(os.listdir(tempdir), ["json.py"])
+
+        self.assertEqual(results[0].result_type, ResultType.COMPLETE)
+
+    def test_bot_can_print(self):
+        code = "print('hello')\n" + FIRST_MOVE_BOT_CODE
+
+        results = self.run_games(code)
+
+        self.assertEqual(results[0].result_type, ResultType.COMPLETE)
+
+    def test_workers_are_reused_and_recycled(self):
+        self.run_games(FIRST_MOVE_BOT_CODE, num_games=2)
+        pids1 = self.worker_pids()
+        self.run_games(FIRST_MOVE_BOT_CODE, num_games=1)
+        pids2 = self.worker_pids()
+
+        # After four games, the worker is recycled
+        self.run_games(FIRST_MOVE_BOT_CODE, num_games=1)
+        pids3 = self.worker_pids()
+        self.run_games(FIRST_MOVE_BOT_CODE, num_games=1)
+        pids4 = self.worker_pids()
+
+        self.assertEqual(pids1, pids2)
+        self.assertEqual(pids3, [])
+        self.assertNotEqual(pids1, pids4)
+
+    def test_worker_exits_during_move(self):
+        code = """
+import os
+
+def get_next_move(board, move_list):
+    if len(move_list) == 2:
+        os._exit(1)
+    return [ix for ix, token in enumerate(board) if token == "."][0]
+"""
+
+        results = self.run_games(code, num_games=2)
+
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0].result_type, ResultType.EXCEPTION)
+        self.assertEqual(results[0].score, -1)
+        self.assertEqual(results[0].move_list, [0, 1])
+
+        # Only the other bot's worker is kept
+        self.assertEqual(len(self.worker_pids()), 1)
+
+        results = self.run_games(FIRST_MOVE_BOT_CODE)
+
+        self.assertEqual(results[0].result_type, ResultType.COMPLETE)
+
+    def test_move_timeout(self):
+        pool = SandboxPool("botany_noughtsandcrosses.game", move_timeout=0.2)
+        self.addCleanup(pool.close)
+        code = "import time\n\ndef get_next_move(board):\n    time.sleep(10)\n"
+
+        results = pool.run_games(FIRST_MOVE_BOT_CODE, code, 1)
+
+        self.assertEqual(results[0].result_type, ResultType.TIME_LIMIT)
+        self.assertEqual(results[0].score, 1)
+        self.assertEqual(results[0].move_list, [0])
+
+    def test_invalid_code(self):
+        with self.assertRaises(SandboxError):
+            self.run_games("from __future__ import braces")
+
+        self.assertEqual(self.worker_pids(), [])
+
+
+def get_next_move_slow(board):
+    while True:
+        pass
+
+
+def get_next_move_slow_catching_exceptions(board):
+    try:
+        while True:
+            pass
+    except Exception:
+        return get_next_move_1(board)
+
+
+def get_next_move_allocating(board):
+    # This is freed straight away, but counts towards the peak
+    bytearray(2 ** 20)
+    return get_next_move_1(board)
+
+
+def get_next_move_raising_memory_error(board):
+    raise MemoryError()
+
+
+class CodeCacheTests(TestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.cache_dir = tmp_dir.name
+
+    def test_create_module_from_str(self):
+        cache = loader.CodeCache()
+
+        mod1 = loader.create_module_from_str("mod1", FIRST_MOVE_BOT_CODE, cache=cache)
+        mod2 = loader.create_module_from_str("mod2", FIRST_MOVE_BOT_CODE, cache=cache)
+
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertIsNot(mod1.__dict__, mod2.__dict__)
+        self.assertIs(mod1.get_next_move.__code__, mod2.get_next_move.__code__)
+
+    def test_path_is_part_of_key(self):
+        cache = loader.CodeCache()
+
+        mod1 = loader.create_module_from_str(
+            "mod1", FIRST_MOVE_BOT_CODE, "a.py", cache=cache
+        )
+        mod2 = loader.create_module_from_str(
+            "mod2", FIRST_MOVE_BOT_CODE, "b.py", cache=cache
+        )
+
+        self.assertEqual(mod1.get_next_move.__code__.co_filename, "a.py")
+        self.assertEqual(mod2.get_next_move.__code__.co_filename, "b.py")
+
+    def test_least_recently_used_code_is_evicted(self):
+        cache = loader.CodeCache(maxsize=2)
+        code1, code2, code3 = [f"x = {ix}" for ix in range(3)]
+
+        for code in [code1, code2, code1, code3, code1, code2]:
+            cache.get_code_object(code)
+
+        self.assertEqual((cache.hits, cache.misses), (2, 4))
+        self.assertEqual(len(cache), 2)
+
+    def test_disk_cache(self):
+        cache1 = loader.CodeCache(cache_dir=self.cache_dir)
+        cache1.get_code_object(FIRST_MOVE_BOT_CODE)
+
+        cache2 = loader.CodeCache(cache_dir=self.cache_dir)
+        with patch("builtins.compile") as compile:
+            mod = loader.create_module_from_str(
+                "mod", FIRST_MOVE_BOT_CODE, cache=cache2
+            )
+
+        compile.assert_not_called()
+        self.assertEqual(mod.get_next_move(list("XO.......")), 2)
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+
+    def test_corrupt_disk_cache_entry(self):
+        cache = loader.CodeCache(cache_dir=self.cache_dir)
+        cache.get_code_object(FIRST_MOVE_BOT_CODE)
+
+        [filename] = os.listdir(self.cache_dir)
+        with open(os.path.join(self.cache_dir, filename), "r+b") as f:
+            f.truncate(20)
+
+        cache.clear()
+        mod = loader.create_module_from_str("mod", FIRST_MOVE_BOT_CODE, cache=cache)
+
+        self.assertEqual(mod.get_next_move(list("XO.......")), 2)
+
+    def test_failed_disk_cache_write(self):
+        cache = loader.CodeCache(cache_dir=self.cache_dir)
+
+        with patch("os.replace", side_effect=OSError):
+            mod = loader.create_module_from_str("mod", FIRST_MOVE_BOT_CODE, cache=cache)
+
+        self.assertEqual(mod.get_next_move(list("XO.......")), 2)
+        self.assertEqual(os.listdir(self.cache_dir), [])
+
+        with patch("marshal.dumps", side_effect=ValueError):
+            with self.assertRaises(ValueError):
+                loader.create_module_from_str(
+                    "mod", FIRST_MOVE_BOT_CODE + "\n", cache=cache
+                )
+
+        self.assertEqual(os.listdir(self.cache_dir), [])
+
+
+class LimitsTests(TestCase):
+    def run_game(self, fn, **kwargs):
+        return run_game(game, fn, get_next_move_1, **kwargs)
+
+    def test_time_limit(self):
+        result = self.run_game(get_next_move_slow, time_limit=0.05)
+
+        self.assertEqual(result.result_type, ResultType.TIME_LIMIT)
+        self.assertEqual(result.score, -1)
+
+    def test_time_limit_when_bot_catches_exception(self):
+        result = self.run_game(get_next_move_slow_catching_exceptions, time_limit=0.05)
+
+        self.assertEqual(result.result_type, ResultType.TIME_LIMIT)
+
+    def test_time_limit_with_opcode_limit(self):
+        result = self.run_game(get_next_move_1, time_limit=1, opcode_limit=1000)
+
+        self.assertEqual(result.result_type, ResultType.COMPLETE)
+
+    def test_time_limit_does_not_count_towards_opcodes(self):
+        opcode_counts = [
+            list(
+                self.run_game(
+                    get_next_move_1, time_limit=time_limit, collect_stats=True
+                ).opcode_counts
+            )
+            for time_limit in [None, 10]
+        ]
+
+        self.assertEqual(opcode_counts[0], opcode_counts[1])
+
+    def test_signal_handler_is_installed_once_per_game(self):
+        with patch("signal.signal", wraps=signal.signal) as signal_signal:
+            result = self.run_game(get_next_move_1, time_limit=10)
+
+        self.assertEqual(result.result_type, ResultType.COMPLETE)
+        self.assertEqual(signal_signal.call_count, 2)
+
+    def test_existing_timer_is_restored(self):
+        signal.setitimer(signal.ITIMER_REAL, 100)
+        self.addCleanup(signal.setitimer, signal.ITIMER_REAL, 0)
+
+        with limits.limited_time(1):
+            pass
+
+        delay, _ = signal.getitimer(signal.ITIMER_REAL)
+        self.assertGreater(delay, 99)
+
+    def test_memory_limit(self):
+        result = self.run_game(get_next_move_allocating, memory_limit=2 ** 19)
+
+        self.assertEqual(result.result_type, ResultType.MEMORY_LIMIT)
+        self.assertEqual(result.score, -1)
+
+    def test_memory_limit_not_exceeded(self):
+        result = self.run_game(get_next_move_allocating, memory_limit=2 ** 21)
+
+        self.assertEqual(result.result_type, ResultType.COMPLETE)
+
+    def test_memory_limit_in_later_move(self):
+        def get_next_move(board):
+            if board.count(".") < 7:
+                bytearray(2 ** 20)
+            return get_next_move_1(board)
+
+        result = run_game(game, get_next_move_1, get_next_move, memory_limit=2 ** 19)
+
+        self.assertEqual(result.result_type, ResultType.MEMORY_LIMIT)
+        self.assertEqual(result.score, 1)
+        self.assertEqual(len(result.move_list), 3)
+
+    def test_memory_limit_when_already_tracing(self):
+        tracemalloc.start()
+        self.addCleanup(tracemalloc.stop)
+        preexisting = bytearray(2 ** 20)
+
+        result = self.run_game(get_next_move_allocating, memory_limit=2 ** 19)
+
+        self.assertEqual(result.result_type, ResultType.MEMORY_LIMIT)
+        self.assertTrue(tracemalloc.is_tracing())
+        self.assertIsNotNone(tracemalloc.get_object_traceback(preexisting))
+
+    def test_memory_error(self):
+        result = self.run_game(get_next_move_raising_memory_error)
+
+        self.assertEqual(result.result_type, ResultType.MEMORY_LIMIT)
+
+
+class ConnectFourBitboardTests(TestCase):
+    def test_random_games(self):
+        for seed in range(100):
+            rng = random.Random(seed)
+            board = connectfour_game.new_board()
+            bitboard = connectfour_bitboard.new_board()
+
+            for token in itertools.cycle(connectfour_game.TOKENS):
+                available_moves = connectfour_game.available_moves(board)
+                self.assertEqual(
+                    connectfour_bitboard.available_moves(bitboard), available_moves
+                )
+
+                if available_moves == []:
+                    break
+
+                move = rng.choice(available_moves)
+                connectfour_game.make_move(board, move, token)
+                connectfour_bitboard.make_move(bitboard, move, token)
+
+                self.assertEqual(connectfour_bitboard.board_for_bot(bitboard), board)
+
+                winner = connectfour_game.check_winner(board)
+                self.assertEqual(connectfour_bitboard.check_winner(bitboard), winner)
+
+                if winner is not None:
+                    break
+
+    def test_run_game(self):
+        def get_next_move(board):
+            # Bots are given a list of lists
+            return [col for col in range(7) if board[col][-1] == "."][-1]
+
+        self.assertEqual(
+            run_game(connectfour_bitboard, get_next_move, get_next_move),
+            run_game(connectfour_game, get_next_move, get_next_move),
+        )
+
+
+class CheckWinnerAfterTests(TestCase):
+    def test_noughtsandcrosses(self):
+        self.check_random_games(game)
+
+    def test_connectfour(self):
+        self.check_random_games(connectfour_game)
+
+    def test_connectfour_bitboard(self):
+        self.check_random_games(connectfour_bitboard)
+
+    def check_random_games(self, game_mod):
+        for seed in range(100):
+            rng = random.Random(seed)
+            board = game_mod.new_board()
+
+            for token in itertools.cycle(game_mod.TOKENS):
+                available_moves = game_mod.available_moves(board)
+                if available_moves == []:
+                    break
+
+                move = rng.choice(available_moves)
+                game_mod.make_move(board, move, token)
+
+                winner = game_mod.check_winner(board)
+                self.assertEqual(
+                    game_mod.check_winner_after(board, move, token), winner
+                )
+
+                if winner is not None:
+                    break
+
+
 def get_next_move_1(board):
     """Return first available move."""
 
@@ -132,6 +132,17 @@ class DownloadBotCodeTest(TestCase):
         ], bots)
         self.maxDiff = default_maxDiff
 
+    def test_generate_zip_yields_chunk_per_bot(self):
+        chunks = list(botany_download.generate_zip(botany_download.get_bots()))
+
+        # One chunk for each bot, and one for the ZIP file's central directory
+        self.assertEqual(len(chunks), len(self.dummy_bots) + 1)
+
+        with zipfile.ZipFile(io.BytesIO(b"".join(chunks)), "r") as zip_file:
+            self.assertCountEqual(
+                zip_file.namelist(), [bot[0] for bot in self.dummy_bots]
+            )
+
     def tearDown(self):
         # Delete the zip file created in one of the tests,
         # whether test fails or passes
@@ -1,3 +1,9 @@
+from django.test import TestCase
+
+from botany.models import Bot
+
+from . import factories
+
 # from hypothesis import given
 # from hypothesis.extra.django import TestCase
 
@@ -49,3 +55,43 @@
 #             self.assertEqual(bot.num_wins, expected_nums_wins[bot])
 #             self.assertEqual(bot.num_draws, expected_nums_draws[bot])
 #             self.assertEqual(bot.num_losses, expected_nums_losses[bot])
+
+
+class BotWithStatsTests(TestCase):
+    keys = ["num_played", "num_wins", "num_draws", "num_losses", "score"]
+
+    def test_with_stats(self):
+        bot1, bot2, bot3 = [factories.create_bot() for _ in range(3)]
+        factories.report_result(bot1.id, bot2.id, 1)
+        factories.report_result(bot1.id, bot2.id, -1)
+        factories.report_result(bot2.id, bot1.id, -1)
+        factories.report_result(bot3.id, bot1.id, 0)
+        factories.report_result(bot3.id, bot2.id, 1)
+
+        with self.assertNumQueries(1):
+            bots = list(Bot.objects.with_stats().order_by("id"))
+
+        with self.assertNumQueries(0):
+            stats = [[getattr(bot, k) for k in self.keys] for bot in bots]
+
+        self.assertEqual(stats, [[4, 2, 1, 1, 1], [4, 1, 0, 3, -2], [2, 1, 1, 0, 1]])
+
+        # The annotations match the values calculated by the properties
+        for bot, bot_stats in zip([bot1, bot2, bot3], stats):
+            self.assertEqual([getattr(bot, k) for k in self.keys], bot_stats)
+
+
+class SetFlagsEtcTests(TestCase):
+    def test_set_flags_etc(self):
+        bot = factories.create_bot()
+        code_size = bot.code_size
+        Bot.objects.filter(id=bot.id).update(is_goldfish=None, code_size=None)
+        bot.refresh_from_db()
+
+        bot.set_flags_etc()
+        bot.refresh_from_db()
+
+        self.assertTrue(bot.is_goldfish)
+        self.assertEqual(bot.code_size, code_size)
+        self.assertTrue(bot.is_one_hit_wonder)
+        self.assertFalse(bot.is_from_beginner)
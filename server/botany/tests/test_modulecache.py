@@ -0,0 +1,40 @@
+from django.test import TestCase
+
+from botany.modulecache import BotModuleCache
+
+from . import factories
+
+
+def create_bot(ix):
+    code = factories.bot_code("randobot") + f"\n# Bot {ix}\n"
+    return factories.create_bot(code=code)
+
+
+class BotModuleCacheTests(TestCase):
+    def test_create_module(self):
+        cache = BotModuleCache(maxsize=2)
+        bot = factories.create_bot()
+
+        mod1 = cache.create_module("mod1", bot)
+        mod2 = cache.create_module("mod2", bot)
+
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertIsNot(mod1.__dict__, mod2.__dict__)
+        self.assertIs(mod1.get_next_move.__code__, mod2.get_next_move.__code__)
+
+    def test_least_recently_used_bot_is_evicted(self):
+        cache = BotModuleCache(maxsize=2)
+        bot1, bot2, bot3 = [create_bot(ix) for ix in range(3)]
+
+        for bot in [bot1, bot2, bot1, bot3, bot1, bot2]:
+            cache.get_code_object(bot)
+
+        self.assertEqual((cache.hits, cache.misses), (2, 4))
+        self.assertEqual(len(cache), 2)
+
+    def test_bots_with_same_code_share_entry(self):
+        cache = BotModuleCache(maxsize=2)
+        bot1, bot2 = [factories.create_bot() for _ in range(2)]
+
+        self.assertIs(cache.get_code_object(bot1), cache.get_code_object(bot2))
+        self.assertEqual(len(cache), 1)
@@ -0,0 +1,46 @@
+from django.test import TestCase
+
+from botany.moves import decode_moves, encode_moves
+
+from . import factories
+
+
+class MovesTests(TestCase):
+    def test_single_byte_moves(self):
+        move_list = [0, 1, 4, 7, 8]
+
+        self.assertEqual(encode_moves(move_list), b"\x00\x01\x04\x07\x08")
+        self.assertEqual(decode_moves(encode_moves(move_list)), move_list)
+
+    def test_multi_byte_moves(self):
+        move_list = [3, 127, 128, 300, 0, 2 ** 20]
+
+        data = encode_moves(move_list)
+
+        self.assertEqual(data[:4], b"\x03\x7f\x80\x01")
+        self.assertEqual(decode_moves(data), move_list)
+
+    def test_no_moves(self):
+        self.assertEqual(encode_moves([]), b"")
+        self.assertEqual(decode_moves(b""), [])
+
+    def test_decode_memoryview(self):
+        self.assertEqual(decode_moves(memoryview(b"\x05\x80\x01")), [5, 128])
+
+    def test_truncated_data(self):
+        with self.assertRaises(ValueError):
+            decode_moves(b"\x05\x80")
+
+    def test_negative_move(self):
+        with self.assertRaises(ValueError):
+            encode_moves([1, -1])
+
+    def test_game_with_more_than_ten_moves(self):
+        bot1 = factories.create_bot()
+        bot2 = factories.create_bot()
+        move_list = [3, 10, 11, 4, 12, 41]
+
+        factories.report_result(bot1.id, bot2.id, 1, move_list)
+
+        game = bot1.bot1_games.get()
+        self.assertEqual(game.move_list(), move_list)
@@ -1,3 +1,13 @@
+from importlib import import_module
+
+from django.apps import apps
+from django.test import TestCase
+
+from botany import actions, tournament
+from botany.models import Standing
+
+from . import factories
+
 # from hypothesis import given
 # from hypothesis.extra.django import TestCase
 
@@ -254,4 +264,141 @@
 #             ids: count for ids, count in unplayed_games.items() if count > 0
 #         }
 
-#         self.assertEqual(tournament.all_unplayed_games(), unplayed_games)
+#         self.assertEqual(dict(tournament.all_unplayed_games()), unplayed_games)
+
+
+class UnplayedGamesForBotTests(TestCase):
+    def test_unplayed_games_for_bot(self):
+        bot1, bot2, inactive_bot = [factories.create_bot() for _ in range(3)]
+        bot3 = factories.create_bot(user=inactive_bot.user)
+        factories.report_result(bot1.id, bot2.id, 1)
+        factories.report_result(bot1.id, bot2.id, -1)
+        factories.report_result(bot2.id, bot1.id, 0)
+        factories.report_result(bot1.id, inactive_bot.id, 0)
+
+        for _ in range(5):
+            factories.report_result(bot3.id, bot1.id, 0)
+
+        expected_unplayed_games = {
+            (bot1.id, bot2.id): 3,
+            (bot2.id, bot1.id): 4,
+            (bot1.id, bot3.id): 5,
+        }
+
+        with self.assertNumQueries(2):
+            unplayed_games = tournament.unplayed_games_for_bot(bot1)
+
+        self.assertEqual(unplayed_games, expected_unplayed_games)
+
+
+class AllUnplayedGamesTests(TestCase):
+    def test_all_unplayed_games(self):
+        bot1, bot2, inactive_bot = [factories.create_bot() for _ in range(3)]
+        bot3 = factories.create_bot(user=inactive_bot.user)
+        factories.report_result(bot1.id, bot2.id, 1)
+        factories.report_result(bot1.id, bot2.id, -1)
+        factories.report_result(bot2.id, bot1.id, 0)
+        factories.report_result(bot1.id, inactive_bot.id, 0)
+
+        for _ in range(5):
+            factories.report_result(bot3.id, bot1.id, 0)
+
+        expected_unplayed_games = {
+            (bot1.id, bot2.id): 3,
+            (bot1.id, bot3.id): 5,
+            (bot2.id, bot1.id): 4,
+            (bot2.id, bot3.id): 5,
+            (bot3.id, bot2.id): 5,
+        }
+
+        self.assertEqual(
+            dict(tournament.all_unplayed_games()), expected_unplayed_games
+        )
+
+
+class StandingsTests(TestCase):
+    keys = ["id", "num_played", "num_wins", "num_draws", "num_losses", "score"]
+
+    def assertStandings(self, expected_standings):
+        standings = [
+            [getattr(bot, k) for k in self.keys] for bot in tournament.standings()
+        ]
+        calculated_standings = [
+            [getattr(bot, k) for k in self.keys]
+            for bot in tournament.calculate_standings()
+        ]
+
+        self.assertEqual(standings, expected_standings)
+        self.assertEqual(calculated_standings, expected_standings)
+
+    def test_standings(self):
+        bot1, bot2, bot3 = [factories.create_bot() for _ in range(3)]
+        factories.report_result(bot1.id, bot2.id, 1)
+        factories.report_result(bot1.id, bot2.id, -1)
+        factories.report_result(bot2.id, bot1.id, -1)
+        factories.report_result(bot3.id, bot1.id, 0)
+
+        self.assertStandings(
+            [
+                [bot1.id, 4, 2, 1, 1, 1],
+                [bot3.id, 1, 0, 1, 0, 0],
+                [bot2.id, 3, 1, 0, 2, -1],
+            ]
+        )
+
+    def test_standings_when_bots_change_state(self):
+        bot1, bot2 = [factories.create_bot() for _ in range(2)]
+        factories.report_result(bot1.id, bot2.id, 1)
+        factories.report_result(bot2.id, bot1.id, 1)
+        factories.report_result(bot2.id, bot1.id, 1)
+
+        # A new version of bot2 replaces bot2 in the standings
+        bot3 = factories.create_bot(user=bot2.user)
+        factories.report_result(bot3.id, bot1.id, 0)
+
+        self.assertStandings([[bot1.id, 1, 0, 1, 0, 0], [bot3.id, 1, 0, 1, 0, 0]])
+
+        # Reactivating bot2 brings its games back into the standings
+        bot2.refresh_from_db()
+        actions.set_bot_active(bot2, bot2.user)
+
+        self.assertStandings([[bot2.id, 3, 2, 0, 1, 1], [bot1.id, 3, 1, 0, 2, -1]])
+
+        actions.deactivate_user(bot1.user)
+
+        self.assertStandings([[bot2.id, 0, 0, 0, 0, 0]])
+
+    def test_rebuild_standings(self):
+        bot1, bot2 = [factories.create_bot() for _ in range(2)]
+        factories.report_result(bot1.id, bot2.id, 1)
+        Standing.objects.all().delete()
+
+        tournament.rebuild_standings()
+
+        self.assertStandings([[bot1.id, 1, 1, 0, 0, 1], [bot2.id, 1, 0, 0, 1, -1]])
+
+    def test_migration_populates_standings(self):
+        migration = import_module("botany.migrations.0003_standing")
+        bot1, bot2, bot3 = [factories.create_bot() for _ in range(3)]
+        factories.report_result(bot1.id, bot2.id, 1)
+        factories.report_result(bot3.id, bot1.id, 0)
+        factories.report_result(bot3.id, bot2.id, 1)
+        factories.report_result(bot3.id, bot2.id, 1)
+        Standing.objects.all().delete()
+
+        migration.populate_standings(apps, None)
+
+        self.assertStandings(
+            [
+                [bot3.id, 3, 2, 1, 0, 2],
+                [bot1.id, 2, 1, 1, 0, 1],
+                [bot2.id, 3, 0, 0, 3, -3],
+            ]
+        )
+
+    def test_standings_query_count(self):
+        bot1, bot2, bot3 = [factories.create_bot() for _ in range(3)]
+        factories.report_result(bot1.id, bot2.id, 1)
+
+        with self.assertNumQueries(1):
+            list(tournament.standings())
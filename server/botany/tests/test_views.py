@@ -1,14 +1,21 @@
 from datetime import datetime, timedelta, timezone
 import io
+import json
+import os
+import tempfile
 from unittest.mock import patch
 import zipfile
 
+from django.conf import settings
 from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
 from django.core.exceptions import PermissionDenied
+from django.db.models import Q
 from django.http import Http404
 from django.test import override_settings, TestCase, RequestFactory
 
-from botany import views
+from botany import download, views
+from botany.models import Game
 from botany.tests import factories
 
 
@@ -63,6 +70,12 @@ class DownloadBotsCodeBaseTestCase(TestCase):
     # Base test case for all download views
 
     def setUp(self):
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        settings_override = override_settings(BOTS_ZIP_CACHE_DIR=cache_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
         self.factory = RequestFactory()
         self.user = factories.create_user("anne@example.com", "Anne Example")
         self.test_data = [
@@ -84,7 +97,7 @@ class DownloadBotsCodeBaseTestCase(TestCase):
 class DownloadBotsCodeHelperFunctionTest(DownloadBotsCodeBaseTestCase):
 
     def test_download_bots_code_helper_function(self):
-        result = views._download_bots_code()
+        result = views._download_bots_code(self.factory.get(""))
 
         self.assertEqual(result["Content-Type"], "application/zip")
         self.assertEqual(
@@ -105,6 +118,53 @@ class DownloadBotsCodeHelperFunctionTest(DownloadBotsCodeBaseTestCase):
                         bot["code"]
                     )
 
+    def test_download_bots_code_helper_function_without_cache(self):
+        with override_settings(BOTS_ZIP_CACHE_DIR=""):
+            result = views._download_bots_code(self.factory.get(""))
+
+        self.assertEqual(result["Content-Type"], "application/zip")
+        self.assertFalse(result.has_header("ETag"))
+
+        result_buffer = io.BytesIO(result.getvalue())
+        with zipfile.ZipFile(result_buffer, "r") as zf:
+            self.assertCountEqual(zf.namelist(), ["annes_bot.py", "brads_bot.py"])
+
+    def test_download_bots_code_helper_function_with_etag(self):
+        result = views._download_bots_code(self.factory.get(""))
+        etag = result["ETag"]
+        result.close()
+
+        request = self.factory.get("", HTTP_IF_NONE_MATCH=etag)
+        result = views._download_bots_code(request)
+
+        self.assertEqual(result.status_code, 304)
+        self.assertEqual(result["ETag"], etag)
+
+        # A new active bot means a new archive
+        factories.create_bot(name="caras_bot.py")
+        result = views._download_bots_code(request)
+
+        self.assertEqual(result.status_code, 200)
+        self.assertNotEqual(result["ETag"], etag)
+        result.close()
+
+    def test_superseded_zips_are_removed(self):
+        path1, _ = download.get_bots_zip_path()
+        factories.create_bot(name="caras_bot.py")
+        path2, _ = download.get_bots_zip_path()
+
+        self.assertNotEqual(path1, path2)
+        self.assertEqual(
+            os.listdir(settings.BOTS_ZIP_CACHE_DIR), [os.path.basename(path2)]
+        )
+
+    def test_temporary_file_is_removed_if_creating_zip_fails(self):
+        with patch("botany.download.generate_zip", side_effect=ValueError):
+            with self.assertRaises(ValueError):
+                download.get_bots_zip_path()
+
+        self.assertEqual(os.listdir(settings.BOTS_ZIP_CACHE_DIR), [])
+
 
 @override_settings(BOTANY_TOURNAMENT_CLOSE_AT=YESTERDAY)
 class DownloadBotsCodeViewTest(DownloadBotsCodeBaseTestCase):
@@ -196,3 +256,100 @@ class APIDownloadBotsCodeViewTest(DownloadBotsCodeBaseTestCase):
             response.content.decode("utf-8"),
             "Unable to download bots until tournament is complete"
         )
+
+
+class GameViewTest(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        cache.clear()
+
+    def test_rendered_boards_are_cached(self):
+        bot1, bot2 = [factories.create_bot() for _ in range(2)]
+        factories.report_result(bot1.id, bot2.id, 1, [0, 3, 1, 4, 2])
+        game = Game.objects.get()
+
+        with patch("botany_noughtsandcrosses.game.render_html") as render_html:
+            render_html.return_value = "<div></div>"
+
+            for _ in range(2):
+                response = views.game(self.factory.get(""), game.id)
+                self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(render_html.call_count, 6)
+
+
+class UserBotsViewTest(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def test_number_of_queries_does_not_depend_on_number_of_bots(self):
+        user = factories.create_user()
+        opponent = factories.create_bot()
+
+        for _ in range(5):
+            bot = factories.create_bot(user)
+            factories.report_result(bot.id, opponent.id, 1)
+            factories.report_result(opponent.id, bot.id, 0)
+
+        request = self.factory.get("")
+        request.user = AnonymousUser()
+
+        # One query for the user, and one for their bots and their stats
+        with self.assertNumQueries(2):
+            response = views.user_bots(request, user.id)
+
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(ROOT_URLCONF="botany.urls")
+class BotGamesViewTest(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+        self.bot = factories.create_bot()
+        for _ in range(5):
+            opponent = factories.create_bot()
+            factories.report_result(self.bot.id, opponent.id, 1)
+            factories.report_result(opponent.id, self.bot.id, 0)
+
+    def get(self, view, params=None):
+        request = self.factory.get("", params or {})
+        request.user = AnonymousUser()
+        return view(request, self.bot.id)
+
+    def test_games_are_paginated(self):
+        with patch("botany.views.GAMES_PAGE_SIZE", 4):
+            # One query for the bot and its user, and one for each side of the
+            # games (with their bots and users)
+            with self.assertNumQueries(3):
+                response = self.get(views.bot_games)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Older games")
+
+    def test_api_follows_cursor_through_all_games(self):
+        game_ids = []
+        params = {}
+
+        with patch("botany.views.GAMES_PAGE_SIZE", 4):
+            while True:
+                response = self.get(views.api_bot_games, params)
+                data = json.loads(response.content)
+                game_ids.extend(game["id"] for game in data["games"])
+
+                if data["next_cursor"] is None:
+                    break
+                params = {"before": data["next_cursor"]}
+
+        expected_game_ids = list(
+            Game.objects.filter(Q(bot1=self.bot) | Q(bot2=self.bot))
+            .order_by("-created_at", "-id")
+            .values_list("id", flat=True)
+        )
+        self.assertEqual(len(game_ids), 10)
+        self.assertEqual(game_ids, expected_game_ids)
+
+    def test_invalid_cursor(self):
+        response = self.get(views.api_bot_games, {"before": "not-a-cursor"})
+
+        self.assertEqual(response.status_code, 400)
@@ -1,6 +1,12 @@
+import heapq
+import itertools
+
 from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, Count, F, IntegerField, Q, Sum, Value, When
+from django.db.models.functions import Coalesce
 
-from .models import Bot, Game
+from .models import Bot, Game, Standing
 
 
 def unplayed_games_for_bot(bot):
@@ -10,23 +16,26 @@ def unplayed_games_for_bot(bot):
     and bot2 that haven't been played yet, where given bot is one of bot1 or
     bot2.
 
-    Could be made more efficient with single query.
+    Runs two queries, whatever the number of active bots: one to find the other
+    active bots, and one to count the games the bot has played against each of
+    them, grouped by opponent and by which of bot1 and bot2 the bot was.
     """
     unplayed_games = {}
 
     if not bot.is_active:
         return unplayed_games
 
-    for other_bot in Bot.objects.active_bots().exclude(id=bot.id):
-        num_bot1_games = bot.bot1_games.filter(bot2=other_bot).count()
-        num_bot2_games = bot.bot2_games.filter(bot1=other_bot).count()
+    other_bot_ids = Bot.objects.active_bots().exclude(id=bot.id).values_list(
+        "id", flat=True
+    )
 
-        unplayed_games[(bot.id, other_bot.id)] = (
-            settings.BOTANY_NUM_ROUNDS - num_bot1_games
-        )
-        unplayed_games[(other_bot.id, bot.id)] = (
-            settings.BOTANY_NUM_ROUNDS - num_bot2_games
-        )
+    for other_bot_id in other_bot_ids:
+        unplayed_games[(bot.id, other_bot_id)] = settings.BOTANY_NUM_ROUNDS
+        unplayed_games[(other_bot_id, bot.id)] = settings.BOTANY_NUM_ROUNDS
+
+    for bot1_id, bot2_id, num_games in Game.objects.num_games_by_pair_for_bot(bot):
+        if (bot1_id, bot2_id) in unplayed_games:
+            unplayed_games[(bot1_id, bot2_id)] -= num_games
 
     unplayed_games = {ids: count for ids, count in unplayed_games.items() if count > 0}
     return unplayed_games
@@ -35,33 +44,66 @@ def unplayed_games_for_bot(bot):
 def all_unplayed_games():
     """Find all unplayed games.
 
-    Returns a dict mapping (bot1.id, bot2.id) to number of games bewteen bot1
-    and bot2 that haven't been played yet.
+    Yields ((bot1.id, bot2.id), num_games) pairs, where num_games is the number
+    of games between bot1 and bot2 that haven't been played yet.  Pairs of bots
+    that have played all their games are not included.
 
-    Could be made more efficient with single query.
+    The unplayed games are calculated in the database, and are streamed from a
+    server-side cursor (where the database supports it), so that this doesn't
+    need to hold every pair of active bots in memory at once.
     """
-    unplayed_games = {}
 
-    for bot1 in Bot.objects.active_bots():
-        for bot2 in Bot.objects.active_bots():
-            if bot1 == bot2:
-                continue
+    sql = """
+WITH active_bots AS (
+    SELECT id FROM botany_bot
+    WHERE state = 'active'
+),
+
+game_counts AS (
+    SELECT
+        bot1_id,
+        bot2_id,
+        COUNT(*) AS num_games
+    FROM botany_game AS g
+    INNER JOIN active_bots AS b1 ON g.bot1_id = b1.id
+    INNER JOIN active_bots AS b2 ON g.bot2_id = b2.id
+    GROUP BY bot1_id, bot2_id
+)
+
+SELECT
+    b1.id AS bot1_id,
+    b2.id AS bot2_id,
+    %s - COALESCE(c.num_games, 0) AS num_games
+FROM active_bots AS b1
+CROSS JOIN active_bots AS b2
+LEFT JOIN game_counts AS c ON c.bot1_id = b1.id AND c.bot2_id = b2.id
+WHERE b1.id != b2.id AND COALESCE(c.num_games, 0) < %s
+ORDER BY b1.id, b2.id
+    """
 
-            unplayed_games[(bot1.id, bot2.id)] = settings.BOTANY_NUM_ROUNDS
+    params = [settings.BOTANY_NUM_ROUNDS, settings.BOTANY_NUM_ROUNDS]
 
-    for game in Game.objects.games_between_active_bots():
-        unplayed_games[(game.bot1_id, game.bot2_id)] -= 1
+    with connection.chunked_cursor() as cursor:
+        cursor.execute(sql, params)
 
-    unplayed_games = {ids: count for ids, count in unplayed_games.items() if count > 0}
-    return unplayed_games
+        while True:
+            rows = cursor.fetchmany(1000)
+            if not rows:
+                break
+
+            for bot1_id, bot2_id, num_games in rows:
+                yield (bot1_id, bot2_id), num_games
 
 
 def summary():
+    # Each game between active bots is counted in the standings of both bots
+    num_played = Standing.objects.aggregate(num_played=Sum("num_played"))["num_played"]
+
     return {
         "num_bots": Bot.objects.count(),
         "num_active_bots": Bot.objects.active_or_house_bots().count(),
         "num_games": Game.objects.count(),
-        "num_games_between_active_bots": Game.objects.games_between_active_or_house_bots().count(),
+        "num_games_between_active_bots": (num_played or 0) // 2,
     }
 
 
@@ -73,8 +115,40 @@ def recent_games_against_bot(bot):
     return Game.objects.recent_against_bot(bot, 20)
 
 
-def all_games_against_bot(bot):
-    return Game.objects.all_against_bot(bot)
+def games_against_bot_page(bot, page_size, before=None):
+    """Return page of games against bot, most recent first.
+
+    If before is given, it must be a (created_at, id) pair from a game, and only
+    games before that game are returned.  This uses keyset pagination, so every
+    page is found with indexed queries, however far back it is.
+
+    Games where the bot is bot1 and where it is bot2 are fetched separately, so
+    that each query reads at most page_size + 1 rows from the (bot1, created_at,
+    id) or (bot2, created_at, id) index, and the results are merged.  A single
+    query with an OR would have to sort all of the bot's games.
+
+    Returns (games, has_more), where has_more indicates whether there are more
+    games after this page.
+    """
+
+    games = Game.objects.with_bots().order_by("-created_at", "-id")
+
+    if before is not None:
+        # The first filter is implied by the second, but lets the database scan
+        # a range of the index, rather than filtering the bot's newer games
+        created_at, game_id = before
+        games = games.filter(created_at__lte=created_at).filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=game_id)
+        )
+
+    games = heapq.merge(
+        games.filter(bot1=bot)[: page_size + 1],
+        games.filter(bot2=bot)[: page_size + 1],
+        key=lambda game: (game.created_at, game.id),
+        reverse=True,
+    )
+    games = list(itertools.islice(games, page_size + 1))
+    return games[:page_size], len(games) > page_size
 
 
 def all_games_between_bots(bot1, bot2):
@@ -122,8 +196,211 @@ def head_to_head_summary(games, bot1, bot2):
     }
 
 
+STANDINGS_FIELDS = ["num_played", "num_wins", "num_draws", "num_losses", "score"]
+
+
 def standings():
-    """Calculate tournament standings.
+    """Return tournament standings.
+
+    Returns queryset of active bots annotated with:
+        num_played
+        num_wins
+        num_draws
+        num_losses
+        score
+
+    where score is (num_wins - num_losses).
+
+    Bots are ordered according to:
+        ORDER BY score DESC, num_played, num_wins DESC, name
+
+    This is called whenever the homepage is loaded, so rather than calculating
+    the standings from every game, it reads them from the Standing table.  This
+    gives the same results as calculate_standings().
+    """
+
+    annotations = {
+        field_name: Coalesce(f"standing__{field_name}", 0)
+        for field_name in STANDINGS_FIELDS
+    }
+
+    return (
+        Bot.objects.active_or_house_bots()
+        .annotate(**annotations)
+        .order_by("-score", "num_played", "-num_wins", "name")
+    )
+
+
+def record_result_in_standings(bot1_id, bot2_id, score):
+    """Update standings with result of game between bot1 and bot2.
+
+    The standings are only updated if both bots are active or house bots.
+
+    This must be called in the same transaction as the game is created, after
+    lock_bots() has locked both bots.  add_bot_to_standings() and
+    remove_bot_from_standings() lock the bot too, so if one of the bots is being
+    added to or removed from the standings concurrently, either that sees the
+    game, or this sees the bot's new standing.
+    """
+
+    if Standing.objects.filter(bot_id__in=[bot1_id, bot2_id]).count() < 2:
+        return
+
+    results = {bot1_id: build_results(score, 1), bot2_id: build_results(-score, 1)}
+    update_standings(results)
+
+
+def add_bot_to_standings(bot):
+    """Add bot, which has just become active or been created as a house bot, to
+    the standings.
+
+    The results of games between the bot and other active or house bots are
+    added to both the bot's standing and to the other bots' standings.
+    """
+
+    assert bot.is_active or bot.is_house_bot
+
+    with transaction.atomic():
+        lock_bots([bot.id])
+
+        if Standing.objects.filter(bot=bot).exists():
+            return
+
+        opponent_results = results_of_opponents(bot)
+
+        standing = Standing(bot=bot)
+        for results in opponent_results.values():
+            standing.num_played += results["num_played"]
+            standing.num_wins += results["num_losses"]
+            standing.num_draws += results["num_draws"]
+            standing.num_losses += results["num_wins"]
+            standing.score -= results["score"]
+        standing.save()
+
+        update_standings(opponent_results)
+
+
+def remove_bot_from_standings(bot):
+    """Remove bot, which is no longer active, from the standings.
+
+    The results of games between the bot and other active or house bots are
+    removed from the other bots' standings.
+    """
+
+    with transaction.atomic():
+        lock_bots([bot.id])
+
+        num_deleted, _ = Standing.objects.filter(bot=bot).delete()
+        if num_deleted == 0:
+            return
+
+        update_standings(results_of_opponents(bot), sign=-1)
+
+
+def lock_bots(bot_ids):
+    """Lock the rows of bots with given ids until the end of the transaction.
+
+    The rows are locked in order of id, so that concurrent callers can't
+    deadlock.
+    """
+
+    list(Bot.objects.select_for_update().filter(id__in=bot_ids).order_by("id"))
+
+
+def rebuild_standings():
+    """Rebuild the Standing table from scratch from all games."""
+
+    with transaction.atomic():
+        Standing.objects.all().delete()
+        Standing.objects.bulk_create(
+            Standing(
+                bot_id=bot.id,
+                **{
+                    field_name: getattr(bot, field_name)
+                    for field_name in STANDINGS_FIELDS
+                },
+            )
+            for bot in calculate_standings()
+        )
+
+
+def results_of_opponents(bot):
+    """Find results of games between bot and other active or house bots.
+
+    Returns dict mapping id of each other bot that bot has played to a dict of
+    that bot's results against bot, with keys from STANDINGS_FIELDS.
+    """
+
+    states = ["active", "house"]
+    num_games_by_pair_and_score = (
+        Game.objects.filter(
+            Q(bot1=bot, bot2__state__in=states) | Q(bot2=bot, bot1__state__in=states)
+        )
+        .order_by()
+        .values_list("bot1_id", "bot2_id", "score")
+        .annotate(num_games=Count("id"))
+    )
+
+    opponent_results = {}
+
+    for bot1_id, bot2_id, score, num_games in num_games_by_pair_and_score:
+        if bot1_id == bot.id:
+            opponent_id, opponent_score = bot2_id, -score
+        else:
+            opponent_id, opponent_score = bot1_id, score
+
+        results = build_results(opponent_score, num_games)
+
+        if opponent_id in opponent_results:
+            for field_name in STANDINGS_FIELDS:
+                opponent_results[opponent_id][field_name] += results[field_name]
+        else:
+            opponent_results[opponent_id] = results
+
+    return opponent_results
+
+
+def build_results(score, num_games):
+    """Return dict, with keys from STANDINGS_FIELDS, representing num_games
+    games that ended with given score from a bot's point of view."""
+
+    return {
+        "num_played": num_games,
+        "num_wins": num_games if score == 1 else 0,
+        "num_draws": num_games if score == 0 else 0,
+        "num_losses": num_games if score == -1 else 0,
+        "score": num_games * score,
+    }
+
+
+def update_standings(results_by_bot_id, sign=1):
+    """Add (or, if sign is -1, subtract) results to bots' standings.
+
+    results_by_bot_id maps bot ids to dicts of results, with keys from
+    STANDINGS_FIELDS.  All the standings are updated with a single query.
+    """
+
+    if not results_by_bot_id:
+        return
+
+    updates = {}
+
+    for field_name in STANDINGS_FIELDS:
+        delta = Case(
+            *[
+                When(bot_id=bot_id, then=Value(sign * results[field_name]))
+                for bot_id, results in results_by_bot_id.items()
+            ],
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+        updates[field_name] = F(field_name) + delta
+
+    Standing.objects.filter(bot_id__in=results_by_bot_id).update(**updates)
+
+
+def calculate_standings():
+    """Calculate tournament standings from all games.
 
     Returns queryset of active bots annotated with:
         num_played
@@ -137,9 +414,7 @@ def standings():
     Bots are ordered according to:
         ORDER BY score DESC, num_played, num_wins DESC, b.name
 
-    This is likely to be called often -- whenever the homepage is loaded -- so
-    the results could be cached, or we could use materialized views rather than
-    CTEs.
+    This is used to rebuild the Standing table, from which standings() reads.
     """
 
     sql = """
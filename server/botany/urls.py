@@ -26,6 +26,7 @@ urlpatterns = [
     path("token/", views.token, name="token"),
     path("api/setup/", views.api_setup, name="api_setup"),
     path("api/submit/", views.api_submit, name="api_submit"),
+    path("api/bots/<bot_id>/games/", views.api_bot_games, name="api_bot_games"),
     path(
         "api/download-bots/",
         views.api_download_bots_code,
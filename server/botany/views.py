@@ -1,7 +1,7 @@
 import json
 import random
 import urllib
-from base64 import b64decode, b64encode
+from base64 import b64decode, b64encode, urlsafe_b64decode, urlsafe_b64encode
 from datetime import datetime, timezone
 from enum import Enum
 
@@ -9,23 +9,29 @@ from botany_core import loader, runner, verifier
 from django.conf import settings
 from django.contrib.auth import login, logout
 from django.core import signing
+from django.core.cache import cache
 from django.core.exceptions import PermissionDenied
 from django.http import (
+    FileResponse,
     HttpResponseBadRequest,
     Http404,
     JsonResponse,
     HttpResponse,
+    StreamingHttpResponse,
 )
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
 from django.views.decorators.csrf import csrf_exempt
 
 from .actions import create_bot, create_user, set_beginner_flag, set_bot_active
-from .download import get_active_bots
+from .download import generate_zip, get_bots, get_bots_zip_path
 from .models import Bot, Game, User
+from .modulecache import bot_module_cache
 from .tournament import (
-    all_games_against_bot,
     all_games_between_bots,
+    games_against_bot_page,
     head_to_head_summary,
     recent_games_against_bot,
     standings,
@@ -41,6 +47,10 @@ class HttpResponseUnauthorized(HttpResponse):
     status_code = 401
 
 
+# The number of games shown on each page of a bot's games
+GAMES_PAGE_SIZE = 100
+
+
 class TOURNAMENT_STATE(Enum):
     BEFORE = -1
     CLOSED = 0
@@ -79,7 +89,7 @@ def full_standings(request):
 
 
 def bot(request, bot_id):
-    bot = get_object_or_404(Bot, id=bot_id)
+    bot = get_object_or_404(Bot.objects.with_stats(), id=bot_id)
     standings = list(standings_against_bot(bot))
     top_of_standings = standings[:5]
     bottom_of_standings = standings[-5:]
@@ -108,12 +118,76 @@ def bot_standings(request, bot_id):
 
 
 def bot_games(request, bot_id):
-    bot = get_object_or_404(Bot, id=bot_id)
+    bot = get_object_or_404(Bot.objects.select_related("user"), id=bot_id)
+
+    try:
+        before = _decode_games_cursor(request.GET.get("before"))
+    except ValueError:
+        return HttpResponseBadRequest("Invalid cursor")
 
-    ctx = {"bot": bot, "games": all_games_against_bot(bot)}
+    games, has_more = games_against_bot_page(bot, GAMES_PAGE_SIZE, before)
+
+    ctx = {
+        "bot": bot,
+        "games": games,
+        "next_cursor": _encode_games_cursor(games[-1]) if has_more else None,
+    }
     return render(request, "botany/bot_games.html", ctx)
 
 
+def api_bot_games(request, bot_id):
+    """Return page of games against bot as JSON.
+
+    The response includes a next_cursor, which can be passed as the before
+    parameter to get the next page, until next_cursor is null.
+    """
+    bot = get_object_or_404(Bot, id=bot_id)
+
+    try:
+        before = _decode_games_cursor(request.GET.get("before"))
+    except ValueError:
+        return HttpResponseBadRequest("Invalid cursor")
+
+    games, has_more = games_against_bot_page(bot, GAMES_PAGE_SIZE, before)
+
+    data = {
+        "games": [
+            {
+                "id": game.id,
+                "bot1_id": game.bot1_id,
+                "bot2_id": game.bot2_id,
+                "score": game.score,
+                "moves": game.move_list(),
+                "result_type": game.result_type,
+                "created_at": game.created_at.isoformat(),
+            }
+            for game in games
+        ],
+        "next_cursor": _encode_games_cursor(games[-1]) if has_more else None,
+    }
+    return JsonResponse(data)
+
+
+def _encode_games_cursor(game):
+    data = json.dumps([game.created_at.isoformat(), game.id])
+    return urlsafe_b64encode(data.encode("utf8")).decode("ascii")
+
+
+def _decode_games_cursor(cursor):
+    """Return (created_at, id) pair encoded by _encode_games_cursor(), or None
+    if there is no cursor.  Raises ValueError if the cursor is invalid."""
+    if not cursor:
+        return None
+
+    # All the ways that decoding can fail raise ValueError (or a subclass of it)
+    # except for unpacking or converting values of the wrong type.
+    try:
+        created_at, game_id = json.loads(urlsafe_b64decode(cursor.encode("ascii")))
+        return datetime.fromisoformat(created_at), int(game_id)
+    except TypeError:
+        raise ValueError(cursor)
+
+
 def bot_head_to_head(request, bot_id, other_bot_id):
     bot = get_object_or_404(Bot, id=bot_id)
     other_bot = get_object_or_404(Bot, id=other_bot_id)
@@ -125,10 +199,15 @@ def bot_head_to_head(request, bot_id, other_bot_id):
 
 
 def _make_bot_move(game_mod, bot_object, board, move_list, token, state):
-    bot_mod = loader.create_module_from_str("bot", bot_object.code)
+    bot_mod = bot_module_cache.create_module("bot", bot_object)
     fn = bot_mod.get_next_move
     param_list = runner.get_param_list(fn)
-    all_args = {"board": board, "move_list": [], "token": token, "state": state}
+    all_args = {
+        "board": runner.board_for_bot(game_mod, board),
+        "move_list": [],
+        "token": token,
+        "state": state,
+    }
     args = {param: value for param, value in all_args.items() if param in param_list}
     rv = fn(**args)
     try:
@@ -138,8 +217,7 @@ def _make_bot_move(game_mod, bot_object, board, move_list, token, state):
         bot_move, state = rv, None
         print("Got no state")
     move_list.append(bot_move)
-    boards = runner.rerun_game(game_mod, move_list)
-    board = boards[-1]
+    board = runner.final_board(game_mod, move_list)
     return (board, move_list, state)
 
 
@@ -167,8 +245,7 @@ def play(request, bot1_id, bot2_id):
         token = game_mod.TOKENS[len(moves) % 2]
         other_token = game_mod.TOKENS[(len(moves) + 1) % 2]
 
-        boards = runner.rerun_game(game_mod, move_list)
-        board = boards[-1]
+        board = runner.final_board(game_mod, move_list)
         assert game_mod.is_valid_move(board, next_move)
 
         game_mod.make_move(board, next_move, token)
@@ -176,7 +253,7 @@ def play(request, bot1_id, bot2_id):
         state = None
 
         # If the human move was not a winning move, it is time for the bot to play.
-        if not game_mod.check_winner(board):
+        if not runner.check_winner_after(game_mod, board, next_move, token):
             if "state" in request.POST:
                 state = json.loads(b64decode(request.POST["state"]))
             board, move_list, state = _make_bot_move(
@@ -197,11 +274,10 @@ def play(request, bot1_id, bot2_id):
         moves = request.GET["moves"]
         state = request.GET.get("state")
         move_list = [int(m) for m in request.GET["moves"]]
-        boards = runner.rerun_game(game_mod, move_list)
-        board = boards[-1]
+        board = runner.final_board(game_mod, move_list)
 
-        if game_mod.check_winner(board):
-            token = game_mod.TOKENS[(len(moves) + 1) % 2]
+        token = game_mod.TOKENS[(len(moves) + 1) % 2]
+        if runner.check_winner_after(game_mod, board, move_list[-1], token):
             result = f"{token} wins"
         elif len(game_mod.available_moves(board)) == 0:
             result = "draw"
@@ -262,7 +338,7 @@ def user_bots(request, user_id):
 
     ctx = {
         "bot_user": bot_user,
-        "bots": bot_user.bots.order_by("-created_at"),
+        "bots": bot_user.bots.with_stats().order_by("-created_at"),
         "editable": editable,
         "bot_img_src": f"botany/img/botany-bot-{random.randint(1, 7)}.png",
     }
@@ -273,9 +349,7 @@ def game(request, game_id):
     game = get_object_or_404(Game, id=game_id)
 
     game_mod = loader.load_module_from_dotted_path(settings.BOTANY_GAME_MODULE)
-    boards = runner.rerun_game(game_mod, game.move_list())
-
-    rendered_boards = [game_mod.render_html(board) for board in boards]
+    rendered_boards = _render_boards(game_mod, game)
 
     ctx = {
         "game": game,
@@ -287,6 +361,22 @@ def game(request, game_id):
     return render(request, "botany/game.html", ctx)
 
 
+def _render_boards(game_mod, game):
+    """Return list of HTML for each board in game.
+
+    Games never change once they've been reported, so the HTML is cached.
+    """
+    key = f"rendered-boards:{settings.BOTANY_GAME_MODULE}:{game.id}"
+    rendered_boards = cache.get(key)
+
+    if rendered_boards is None:
+        boards = runner.generate_boards(game_mod, game.move_list())
+        rendered_boards = [game_mod.render_html(board) for board in boards]
+        cache.set(key, rendered_boards, timeout=None)
+
+    return rendered_boards
+
+
 def prelogin(request):
     url = settings.AUTH_LOGIN_URL
     if "next" in request.GET:
@@ -366,11 +456,20 @@ def api_submit(request):
     return JsonResponse({})
 
 
-def _download_bots_code():
-    zip_buffer = get_active_bots()
-    response = HttpResponse(
-        zip_buffer.getvalue(), content_type="application/zip"
-    )
+def _download_bots_code(request):
+    if settings.BOTS_ZIP_CACHE_DIR:
+        path, fingerprint = get_bots_zip_path()
+        etag = quote_etag(fingerprint)
+
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = FileResponse(open(path, "rb"), content_type="application/zip")
+        response["ETag"] = etag
+    else:
+        response = StreamingHttpResponse(
+            generate_zip(get_bots()), content_type="application/zip"
+        )
+
     response["Content-Disposition"] = "attachment; filename=bots.zip"
     return response
 
@@ -384,7 +483,7 @@ def download_bots_code(request):
     if not request.user.is_authenticated:
         raise PermissionDenied
 
-    return _download_bots_code()
+    return _download_bots_code(request)
 
 
 def api_download_bots_code(request):
@@ -403,7 +502,7 @@ def api_download_bots_code(request):
     except User.DoesNotExist:
         return HttpResponseUnauthorized("Invalid API token")
 
-    return _download_bots_code()
+    return _download_bots_code(request)
 
 
 def error(request):
@@ -0,0 +1,20 @@
+from django.db import close_old_connections
+from rq import SimpleWorker
+
+
+class GameWorker(SimpleWorker):
+    """Worker that performs jobs in its own process, rather than forking a new
+    process for each job.
+
+    This means that botany.sandbox.sandbox_pool's subprocesses, and the compiled
+    code in botany.modulecache.bot_module_cache, are reused between jobs.
+    """
+
+    def perform_job(self, *args, **kwargs):
+        # Database connections are kept between jobs, so they need to be closed
+        # if they have expired or are broken, as Django does between requests
+        close_old_connections()
+        try:
+            return super().perform_job(*args, **kwargs)
+        finally:
+            close_old_connections()